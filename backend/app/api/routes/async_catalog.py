@@ -0,0 +1,353 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.auth.dependencies import get_current_user
+from app.core.cache import named_cache
+from app.core.config import settings
+from app.core.text import normalize_name
+from app.db import CategoryDB, ProductDB, SupplierDB
+from app.db_async import get_async_db, touch
+from app import catalog, changes
+from app.models.category import Category, CategoryCreate, CategoryUpdate
+from app.api.routes.products import EXPANDABLE, EXPAND_QUERY, parse_expand
+from app.models.product import Product, ProductCreate, ProductExpanded, ProductUpdate
+from app.models.supplier import Supplier, SupplierCreate, SupplierUpdate
+
+# ---------------------------------------------------------------
+# Versiones async de los handlers CRUD (se montan con ASYNC_DB=true)
+#
+# Se registran antes que los routers sincronos: para las mismas rutas y
+# metodos gana la version async; el resto (listado de productos con busqueda,
+# cursor, importacion...) sigue atendido por los handlers sincronos.
+
+categories_router = APIRouter(prefix="/categories", tags=["categories"])
+suppliers_router = APIRouter(prefix="/suppliers", tags=["suppliers"])
+products_router = APIRouter(prefix="/products", tags=["products"])
+
+# Mismos caches con nombre (y claves con version) que usan los routers sincronos
+_categories_cache = named_cache(
+    "categories", maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL_SECONDS
+)
+_suppliers_cache = named_cache(
+    "suppliers", maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL_SECONDS
+)
+_categories_adapter = TypeAdapter(List[Category])
+_suppliers_adapter = TypeAdapter(List[Supplier])
+
+
+def _json(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+# --- Categorias ---
+
+@categories_router.get("", response_model=List[Category])
+async def list_categories(db: AsyncSession = Depends(get_async_db)):
+    """Lista todas las categorias."""
+    version = await run_in_threadpool(catalog.version, "categories")
+    body = _categories_cache.get((version, "list"))
+    if body is None:
+        items = (await db.scalars(select(CategoryDB).order_by(CategoryDB.name))).all()
+        body = _categories_adapter.dump_json(_categories_adapter.validate_python(items, from_attributes=True))
+        _categories_cache.set((version, "list"), body)
+    return _json(body)
+
+
+@categories_router.get("/{category_id}", response_model=Category)
+async def get_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Obtiene una categoria por su ID."""
+    version = await run_in_threadpool(catalog.version, "categories")
+    body = _categories_cache.get((version, "id", category_id))
+    if body is None:
+        category = await db.get(CategoryDB, category_id)
+        if not category:
+            raise HTTPException(status_code=404, detail="Categoria no encontrada")
+        body = Category.model_validate(category).model_dump_json().encode()
+        _categories_cache.set((version, "id", category_id), body)
+    return _json(body)
+
+
+async def _category_name_taken(db: AsyncSession, name: str, exclude_id: Optional[int] = None) -> bool:
+    stmt = select(CategoryDB.id).where(CategoryDB.name.ilike(name))
+    if exclude_id is not None:
+        stmt = stmt.where(CategoryDB.id != exclude_id)
+    return (await db.scalar(stmt.limit(1))) is not None
+
+
+@categories_router.post("", response_model=Category, status_code=201)
+async def create_category(
+    payload: CategoryCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    """Crea una nueva categoria."""
+    if await _category_name_taken(db, payload.name.strip()):
+        raise HTTPException(status_code=409, detail="La categoria ya existe")
+
+    category = CategoryDB(name=payload.name.strip())
+    db.add(category)
+    changes.record(db.sync_session, "category", "created", category)
+    await touch(db, "categories")
+    await db.commit()
+    return category
+
+
+@categories_router.put("/{category_id}", response_model=Category)
+async def update_category(
+    category_id: int,
+    payload: CategoryUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    """Actualiza una categoria por su ID."""
+    category = await db.get(CategoryDB, category_id)
+    if not category:
+        raise HTTPException(status_code=404, detail="Categoria no encontrada")
+
+    if payload.name:
+        if await _category_name_taken(db, payload.name.strip(), exclude_id=category_id):
+            raise HTTPException(status_code=409, detail="Ya existe otra categoria con ese nombre")
+        category.name = payload.name.strip()  # type: ignore
+
+    changes.record(db.sync_session, "category", "updated", category)
+    await touch(db, "categories")
+    await db.commit()
+    return category
+
+
+@categories_router.delete("/{category_id}", status_code=204)
+async def delete_category(
+    category_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    """Elimina una categoria por su ID."""
+    category = await db.get(CategoryDB, category_id)
+    if not category:
+        raise HTTPException(status_code=404, detail="Categoria no encontrada")
+
+    products_in_category = await db.scalar(
+        select(func.count(ProductDB.id)).where(ProductDB.categoria_id == category_id)
+    )
+    if products_in_category:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No se puede eliminar la categoria, tiene {products_in_category} productos asociados."
+        )
+
+    await db.delete(category)
+    changes.record(db.sync_session, "category", "deleted", {"id": category_id})
+    await touch(db, "categories")
+    await db.commit()
+    return None
+
+
+# --- Proveedores ---
+
+@suppliers_router.get("", response_model=List[Supplier])
+async def list_suppliers(db: AsyncSession = Depends(get_async_db)):
+    """Lista todos los proveedores."""
+    version = await run_in_threadpool(catalog.version, "suppliers")
+    body = _suppliers_cache.get((version, "list"))
+    if body is None:
+        items = (await db.scalars(select(SupplierDB).order_by(SupplierDB.name))).all()
+        body = _suppliers_adapter.dump_json(_suppliers_adapter.validate_python(items, from_attributes=True))
+        _suppliers_cache.set((version, "list"), body)
+    return _json(body)
+
+
+@suppliers_router.get("/{supplier_id}", response_model=Supplier)
+async def get_supplier(supplier_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Obtiene un proveedor por su ID."""
+    version = await run_in_threadpool(catalog.version, "suppliers")
+    body = _suppliers_cache.get((version, "id", supplier_id))
+    if body is None:
+        supplier = await db.get(SupplierDB, supplier_id)
+        if not supplier:
+            raise HTTPException(status_code=404, detail="Proveedor no encontrado")
+        body = Supplier.model_validate(supplier).model_dump_json().encode()
+        _suppliers_cache.set((version, "id", supplier_id), body)
+    return _json(body)
+
+
+async def _supplier_name_taken(db: AsyncSession, name: str, exclude_id: Optional[int] = None) -> bool:
+    stmt = select(SupplierDB.id).where(SupplierDB.name.ilike(name))
+    if exclude_id is not None:
+        stmt = stmt.where(SupplierDB.id != exclude_id)
+    return (await db.scalar(stmt.limit(1))) is not None
+
+
+@suppliers_router.post("", response_model=Supplier, status_code=201)
+async def create_supplier(
+    payload: SupplierCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    """Crea un nuevo proveedor."""
+    if await _supplier_name_taken(db, payload.name.strip()):
+        raise HTTPException(status_code=409, detail="El proveedor ya existe")
+
+    supplier = SupplierDB(name=payload.name.strip(), phone=payload.phone, email=payload.email)
+    db.add(supplier)
+    changes.record(db.sync_session, "supplier", "created", supplier)
+    await touch(db, "suppliers")
+    await db.commit()
+    return supplier
+
+
+@suppliers_router.put("/{supplier_id}", response_model=Supplier)
+async def update_supplier(
+    supplier_id: int,
+    payload: SupplierUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    """Actualiza un proveedor por su ID."""
+    supplier = await db.get(SupplierDB, supplier_id)
+    if not supplier:
+        raise HTTPException(status_code=404, detail="Proveedor no encontrado")
+
+    if payload.name and await _supplier_name_taken(db, payload.name.strip(), exclude_id=supplier_id):
+        raise HTTPException(status_code=409, detail="Ya existe otro proveedor con ese nombre")
+
+    for field, value in payload.model_dump(exclude_unset=True).items():
+        setattr(supplier, field, value)
+
+    changes.record(db.sync_session, "supplier", "updated", supplier)
+    await touch(db, "suppliers")
+    await db.commit()
+    return supplier
+
+
+@suppliers_router.delete("/{supplier_id}", status_code=204)
+async def delete_supplier(
+    supplier_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    """Elimina un proveedor por su ID."""
+    supplier = await db.get(SupplierDB, supplier_id)
+    if not supplier:
+        raise HTTPException(status_code=404, detail="Proveedor no encontrado")
+
+    products_with_supplier = await db.scalar(
+        select(func.count(ProductDB.id)).where(ProductDB.supplier_id == supplier_id)
+    )
+    if products_with_supplier:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No se puede eliminar el proveedor, tiene {products_with_supplier} productos asociados."
+        )
+
+    await db.delete(supplier)
+    changes.record(db.sync_session, "supplier", "deleted", {"id": supplier_id})
+    await touch(db, "suppliers")
+    await db.commit()
+    return None
+
+
+# --- Productos ---
+
+async def _check_product_name(db: AsyncSession, name: str, exclude_id: Optional[int] = None):
+    """Duplicado exacto y casi duplicado (clave normalizada indexada)."""
+    exact = select(ProductDB.id).where(func.lower(ProductDB.name) == func.lower(name.strip()))
+    similar = select(ProductDB.id).where(ProductDB.name_key == normalize_name(name))
+    if exclude_id is not None:
+        exact = exact.where(ProductDB.id != exclude_id)
+        similar = similar.where(ProductDB.id != exclude_id)
+
+    if (await db.scalar(exact.limit(1))) is not None:
+        detail = "Producto duplicado" if exclude_id is None else "Ya existe otro producto con ese nombre"
+        raise HTTPException(status_code=409, detail=detail)
+    if (await db.scalar(similar.limit(1))) is not None:
+        raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
+
+
+async def _commit_or_conflict(db: AsyncSession):
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
+
+
+@products_router.post("", response_model=Product, status_code=201)
+async def create_product(
+    payload: ProductCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    await _check_product_name(db, payload.name)
+
+    product = ProductDB(
+        name=payload.name.strip(),
+        price=payload.price,
+        categoria_id=payload.categoria_id,
+        supplier_id=payload.supplier_id,
+    )
+    db.add(product)
+    changes.record(db.sync_session, "product", "created", product)
+    await touch(db, "products")
+    await _commit_or_conflict(db)
+    return Product.model_validate(product)
+
+
+@products_router.get("/{product_id}", response_model=ProductExpanded)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db), expand: Optional[str] = EXPAND_QUERY):
+    expand_names = parse_expand(expand)
+    product = await db.get(ProductDB, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    data = Product.model_validate(product).model_dump()
+    for name in expand_names:
+        model, adapter, fk = EXPANDABLE[name]
+        related = await db.get(model, data[fk])
+        data[name] = adapter.validate_python(related, from_attributes=True) if related else None
+    # Solo las relaciones pedidas, igual que el handler sincrono
+    return _json(ProductExpanded.model_validate(data).model_dump_json(exclude_unset=True).encode())
+
+
+@products_router.put("/{product_id}", response_model=Product)
+async def update_product(
+    product_id: int,
+    payload: ProductUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    product = await db.get(ProductDB, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+    if payload.name:
+        await _check_product_name(db, payload.name, exclude_id=product_id)
+
+    for field, value in payload.model_dump(exclude_unset=True).items():
+        setattr(product, field, value)
+
+    changes.record(db.sync_session, "product", "updated", product)
+    await touch(db, "products")
+    await _commit_or_conflict(db)
+    return Product.model_validate(product)
+
+
+@products_router.delete("/{product_id}", status_code=204)
+async def delete_product(
+    product_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: dict = Depends(get_current_user),
+):
+    product = await db.get(ProductDB, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+    await db.delete(product)
+    changes.record(db.sync_session, "product", "deleted", {"id": product_id})
+    await touch(db, "products")
+    await db.commit()
+    return None
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session, joinedload
 from app.db import SessionLocal, CategoryDB, ProductDB 
+from app.db_routing import read_session
 from app.models.category import Category, CategoryCreate, CategoryUpdate   
 from typing import List
 from app.auth.dependencies import get_current_user
+from app.core.cache import named_cache
+from app.core.config import settings
+from app import catalog, changes
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+# Respuestas JSON ya serializadas; la clave lleva la version de la tabla y
+# clear() solo libera memoria en cada escritura
+_cache = named_cache("categories", maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL_SECONDS)
+catalog.on_change("categories", _cache.clear)
+_list_adapter = TypeAdapter(List[Category])
+
 def get_db():
     db = SessionLocal()
     try:
@@ -15,18 +26,35 @@ def get_db():
         db.close()
 
 
+# Sesion para los GET: replica de lectura o primario (ver app.db_routing)
+def get_read_db(request: Request):
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 @router.get("", response_model=List[Category])
-def list_categories(db: Session = Depends(get_db)):
+def list_categories(db: Session = Depends(get_read_db)):
     """Lista todas las categorias."""
-    return db.query(CategoryDB).order_by(CategoryDB.name).all()
+    def load():
+        items = db.query(CategoryDB).order_by(CategoryDB.name).all()
+        return _list_adapter.dump_json(_list_adapter.validate_python(items, from_attributes=True))
+
+    return Response(content=_cache.get_or_set((catalog.version("categories"), "list"), load), media_type="application/json")
 
 @router.get("/{category_id}", response_model=Category)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+def get_category(category_id: int, db: Session = Depends(get_read_db)):
     """Obtiene una categoria por su ID."""
-    category = db.query(CategoryDB).filter(CategoryDB.id == category_id).first()
-    if not category:
+    def load():
+        category = db.query(CategoryDB).filter(CategoryDB.id == category_id).first()
+        return Category.model_validate(category).model_dump_json().encode() if category else None
+
+    body = _cache.get_or_set((catalog.version("categories"), "id", category_id), load)
+    if body is None:
         raise HTTPException(status_code=404, detail="Categoria no encontrada")
-    return category
+    return Response(content=body, media_type="application/json")
 
 # --- Rutas Protegidas (Solo Admin) ---
 
@@ -43,6 +71,8 @@ def create_category(
 
     category = CategoryDB(name=payload.name.strip())
     db.add(category)
+    changes.record(db, "category", "created", category)
+    catalog.touch(db, "categories")
     db.commit()
     db.refresh(category)
     return category
@@ -68,6 +98,8 @@ def update_category(
             raise HTTPException(status_code=409, detail="Ya existe otra categoria con ese nombre")
         category.name = payload.name.strip() # type: ignore
 
+    changes.record(db, "category", "updated", category)
+    catalog.touch(db, "categories")
     db.commit()
     db.refresh(category)
     return category
@@ -91,6 +123,8 @@ def delete_category(
         )
 
     db.delete(category)
+    changes.record(db, "category", "deleted", {"id": category_id})
+    catalog.touch(db, "categories")
     db.commit()
     return None
 
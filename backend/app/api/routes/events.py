@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app import catalog
+from app.changes import OVERFLOW, broker, since
+from app.core.config import settings
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+RETRY_MS = 3000
+
+
+@router.get("/events")
+async def catalog_events(
+    last_event_id: Optional[int] = Query(None, description="Reanudar despues de este id (alternativa al header)"),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Cambios del catalogo como server-sent events (altas, ediciones, bajas y
+    cambios masivos de precios). Cada evento lleva `id`; al reconectar con
+    Last-Event-ID se reenvian los cambios posteriores desde el registro. Un
+    evento de tipo "reset" indica que hay que recargar el catalogo completo.
+    """
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    if broker.full():
+        raise HTTPException(status_code=503, detail="Demasiadas conexiones al stream de cambios")
+
+    async def stream():
+        # La suscripcion vive dentro del generador: si la respuesta se descarta
+        # antes de empezar, no queda un suscriptor ocupando un lugar
+        subscriber = None
+        try:
+            subscriber = await run_in_threadpool(broker.subscribe, asyncio.get_running_loop())
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            if subscriber is None:
+                return  # se lleno entre la verificacion y el inicio: el cliente reintenta
+            last_sent = 0
+            if resume_from is not None:
+                # Suscrito antes de leer el registro: lo nuevo queda en la cola
+                replay, reset = await run_in_threadpool(since, resume_from)
+                if reset:
+                    yield b'data: {"type":"reset"}\n\n'
+                for change in replay:
+                    yield change.frame
+                    last_sent = change.id
+
+            now = time.monotonic()
+            deadline = now + settings.CHANGE_STREAM_MAX_SECONDS
+            next_keepalive = now + settings.CHANGE_STREAM_KEEPALIVE_SECONDS
+            while now < deadline:
+                timeout = min(settings.CATALOG_VERSION_REFRESH_SECONDS, deadline - now)
+                try:
+                    change = await asyncio.wait_for(subscriber.queue.get(), timeout=max(timeout, 0.01))
+                except asyncio.TimeoutError:
+                    # Detecta escrituras de otros workers (dispara broker.poll)
+                    await run_in_threadpool(catalog.versions)
+                    now = time.monotonic()
+                    if now >= next_keepalive:
+                        yield b": keepalive\n\n"
+                        next_keepalive = now + settings.CHANGE_STREAM_KEEPALIVE_SECONDS
+                    continue
+                if change is OVERFLOW:
+                    break  # cliente lento: reconecta con Last-Event-ID
+                if change.id > last_sent:
+                    yield change.frame
+                    last_sent = change.id
+                now = time.monotonic()
+        finally:
+            if subscriber is not None:
+                broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,63 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List, Optional, Literal
-from fastapi import APIRouter, HTTPException, Depends, Query, Response
-import unicodedata, re
-
-from app.models.product import Product, ProductCreate, ProductUpdate
-from app.db import SessionLocal, ProductDB, CategoryDB
+from sqlalchemy.orm import Session
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Literal, Sequence, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+import base64, json
+from pydantic import TypeAdapter
+
+from app.models.product import (
+    Product,
+    ProductBatch,
+    ProductBatchRequest,
+    ProductCreate,
+    ProductExpanded,
+    ProductFacets,
+    ProductUpdate,
+)
+from app.models.category import Category
+from app.models.supplier import Supplier
+from app.db import SessionLocal, ProductDB, CategoryDB, SupplierDB
+from app.db_routing import read_session
 from app.auth.dependencies import get_current_user
+from app.core.text import normalize_name as _normalize_name
+from app.search import ProductFilters, product_search_filter
+from app.snapshot import snapshot
+from app.core.cache import named_cache
+from app.core.config import settings
+from app import catalog, changes
 
 router = APIRouter(prefix="/products", tags=["products"])
+# /products/facets: se monta antes que las rutas /products/{product_id}
+facets_router = APIRouter(prefix="/products", tags=["products"])
+
+# Totales por busqueda; se invalidan en cada escritura de productos
+_totals = named_cache(
+    "product_totals", maxsize=settings.PRODUCT_TOTAL_CACHE_SIZE, ttl=settings.PRODUCT_TOTAL_CACHE_TTL_SECONDS
+)
+catalog.on_change("products", _totals.clear)
+# Facetas ya serializadas; incluyen nombres de categorias y proveedores
+_facets = named_cache(
+    "product_facets", maxsize=settings.PRODUCT_FACETS_CACHE_SIZE, ttl=settings.PRODUCT_FACETS_CACHE_TTL_SECONDS
+)
+for _table in ("products", "categories", "suppliers"):
+    catalog.on_change(_table, _facets.clear)
+_list_adapter = TypeAdapter(List[Product])
+_product_adapter = TypeAdapter(Product)
+
+# Columnas de la respuesta: el listado no necesita entidades ORM completas
+PRODUCT_COLUMNS = (ProductDB.id, ProductDB.name, ProductDB.price, ProductDB.categoria_id, ProductDB.supplier_id)
+_PRODUCT_FIELDS = tuple(c.key for c in PRODUCT_COLUMNS)
+
+# Ids por consulta IN (...): por debajo del limite de variables de SQLite
+BATCH_CHUNK_SIZE = 250
+
+# Relaciones que se pueden embeber con expand: (modelo ORM, esquema, columna FK en Row)
+EXPANDABLE = {
+    "category": (CategoryDB, TypeAdapter(Category), "categoria_id"),
+    "supplier": (SupplierDB, TypeAdapter(Supplier), "supplier_id"),
+}
+EXPAND_QUERY = Query(None, description="Relaciones a embeber: category, supplier (separadas por coma)")
 
 
 def get_db():
@@ -19,47 +68,286 @@ def get_db():
         db.close()
 
 
-def _normalize_name(value: str) -> str:
-    s = value.strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = s.encode("ascii", "ignore").decode("ascii")
-    s = re.sub(r"[^a-z0-9\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+# Sesion para los GET: replica de lectura o primario (ver app.db_routing)
+def get_read_db(request: Request):
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _similar_name_exists(db: Session, name: str, exclude_id: Optional[int] = None) -> bool:
+    """Busca un casi duplicado usando el indice unico sobre name_key."""
+    query = db.query(ProductDB.id).filter(ProductDB.name_key == _normalize_name(name))
+    if exclude_id is not None:
+        query = query.filter(ProductDB.id != exclude_id)
+    return query.first() is not None
 
 
-@router.get("", response_model=List[Product])
+def _commit_or_conflict(db: Session):
+    # Otra peticion pudo insertar el mismo nombre entre la verificacion y el commit
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
+
+
+def product_filters(
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoria"),
+    supplier_id: Optional[int] = Query(None, description="Filtrar por proveedor"),
+    min_price: Optional[float] = Query(None, ge=0, description="Precio minimo (inclusive)"),
+    max_price: Optional[float] = Query(None, ge=0, description="Precio maximo (inclusive)"),
+) -> ProductFilters:
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="min_price no puede ser mayor que max_price")
+    return ProductFilters(categoria_id, supplier_id, min_price, max_price)
+
+
+def parse_expand(expand: Optional[str]) -> Tuple[str, ...]:
+    if not expand:
+        return ()
+    names = tuple(dict.fromkeys(n.strip() for n in expand.split(",") if n.strip()))
+    unknown = [n for n in names if n not in EXPANDABLE]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"expand no soportado: {', '.join(unknown)}")
+    return names
+
+
+def _related_bodies(db: Session, expand: Sequence[str], rows: Sequence) -> Dict[str, Dict[int, bytes]]:
+    """
+    JSON de las relaciones pedidas para estas filas: una consulta IN (...) por
+    relacion (como selectinload), sin JOIN ni una consulta por producto.
+    """
+    related = {}
+    for name in expand:
+        model, adapter, fk = EXPANDABLE[name]
+        ids = list({getattr(row, fk) for row in rows})
+        bodies: Dict[int, bytes] = {}
+        for start in range(0, len(ids), BATCH_CHUNK_SIZE):
+            for obj in db.query(model).filter(model.id.in_(ids[start:start + BATCH_CHUNK_SIZE])):
+                bodies[obj.id] = adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+        related[name] = bodies
+    return related
+
+
+def _expand_body(body: bytes, row, expand: Sequence[str], related: Dict[str, Dict[int, bytes]]) -> bytes:
+    # El JSON del producto ya esta serializado: se agregan los objetos antes de la llave final
+    extra = b"".join(
+        b',"' + name.encode() + b'":' + related[name].get(getattr(row, EXPANDABLE[name][2]), b"null")
+        for name in expand
+    )
+    return body[:-1] + extra + b"}"
+
+
+def _sort_key(sort: str):
+    """Columna de ordenamiento principal; el id se usa como desempate."""
+    if sort == "categoria":
+        return func.lower(CategoryDB.name)
+    return getattr(ProductDB, sort)
+
+
+def _encode_cursor(sort: str, order: str, value, last_id: int) -> str:
+    raw = json.dumps({"s": sort, "o": order, "k": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = data["k"], int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+    if data.get("s") != sort or data.get("o") != order:
+        raise HTTPException(status_code=400, detail="El cursor no corresponde al orden solicitado")
+    # El valor se compara contra la columna de orden: debe ser de su tipo
+    if sort == "price":
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, str)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+    return value, last_id
+
+
+@router.get("", response_model=List[ProductExpanded])
 def list_products(
     response: Response,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     q: Optional[str] = Query(None, description="Buscar por nombre de producto"),
     sort: Literal["name", "price", "categoria"] = "name",
     order: Literal["asc", "desc"] = "asc",
     offset: int = 0,
     limit: int = Query(6, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="Paginacion por cursor: vacio para la primera pagina, luego X-Next-Cursor"
+    ),
+    include_total: bool = Query(True, description="Calcular X-Total-Count (false evita el conteo)"),
+    expand: Optional[str] = EXPAND_QUERY,
+    filters: ProductFilters = Depends(product_filters),
 ):
     """
-    Lista productos con busqueda, ordenamiento (nombre, precio o categoria)
-    y paginacion (offset / limit)
+    Lista productos con busqueda, filtros por categoria, proveedor y precio,
+    ordenamiento (nombre, precio o categoria) y paginacion (offset / limit,
+    o por cursor con `cursor`)
     """
-    query = db.query(ProductDB).options(joinedload(ProductDB.category))
+    position = _decode_cursor(cursor, sort, order) if cursor else None
+    expand_names = parse_expand(expand)
+
+    # Snapshot vigente: sin consultas ni serializacion por item
+    current = snapshot.current() if settings.CATALOG_SNAPSHOT_ENABLED else None
+    page = current.page(q, sort, order, offset, limit, cursor is not None, position, filters) if current else None
+    if page is not None:
+        headers = {"X-Total-Count": str(page.total)} if include_total else {}
+        if page.next_position is not None:
+            headers["X-Next-Cursor"] = _encode_cursor(sort, order, *page.next_position)
+        body = page.body
+        if expand_names:
+            related = _related_bodies(db, expand_names, page.rows)
+            body = b"[" + b",".join(_expand_body(r.body, r, expand_names, related) for r in page.rows) + b"]"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    query = db.query(*PRODUCT_COLUMNS)
 
     if q:
-        query = query.filter(ProductDB.name.ilike(f"%{q}%"))
+        query = query.filter(product_search_filter(q))
+    for clause in filters.clauses():
+        query = query.filter(clause)
 
+    key = _sort_key(sort)
     if sort == "categoria":
-        query = query.join(CategoryDB).order_by(
-            func.lower(CategoryDB.name).asc() if order == "asc" else func.lower(CategoryDB.name).desc()
+        query = query.join(CategoryDB)
+    if order == "asc":
+        query = query.order_by(key.asc(), ProductDB.id.asc())
+    else:
+        query = query.order_by(key.desc(), ProductDB.id.desc())
+
+    # Version leida antes de contar: un total de antes de una escritura no se reutiliza
+    total_key = (catalog.version("products"), q or "", filters)
+    total = _totals.get(total_key) if include_total else None
+    cached = total is not None
+
+    if cursor is None:
+        if include_total and total is None:
+            # Filas y total en una sola consulta con COUNT(*) OVER ()
+            rows = query.add_columns(func.count().over()).offset(offset).limit(limit).all()
+            if rows:
+                total = rows[0][-1]
+            else:
+                total = query.count() if offset > 0 else 0
+            products = rows
+        else:
+            products = query.offset(offset).limit(limit).all()
+        _set_total_header(response, total_key, total, cached)
+        return _json_list(db, products, response, expand_names)
+
+    # Modo cursor (keyset): el total se calcula antes de aplicar la posicion
+    if include_total and total is None:
+        total = query.count()
+    _set_total_header(response, total_key, total, cached)
+
+    if position is not None:
+        row_position = tuple_(key, ProductDB.id)
+        query = query.filter(row_position > position if order == "asc" else row_position < position)
+
+    rows = query.add_columns(key.label("sort_value")).limit(limit + 1).all()
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort, order, last.sort_value, last.id)
+    return _json_list(db, rows[:limit], response, expand_names)
+
+
+@facets_router.get("/facets", response_model=ProductFacets)
+def product_facets(
+    db: Session = Depends(get_read_db),
+    q: Optional[str] = Query(None, description="Buscar por nombre de producto"),
+    filters: ProductFilters = Depends(product_filters),
+):
+    """
+    Conteos por categoria y por proveedor y precio minimo / maximo / promedio
+    de los productos que cumplen la busqueda y los filtros actuales
+    """
+    key = (catalog.versions(("products", "categories", "suppliers"))[0], q or "", filters)
+    body = _facets.get(key)
+    if body is None:
+        body = _compute_facets(db, q, filters)
+        _facets.set(key, body)
+    return Response(content=body, media_type="application/json")
+
+
+def _compute_facets(db: Session, q: Optional[str], filters: ProductFilters) -> bytes:
+    # Una sola consulta agrupada por (categoria, proveedor); los totales por
+    # faceta y el precio global se combinan aqui a partir de esos grupos
+    query = (
+        db.query(
+            ProductDB.categoria_id,
+            CategoryDB.name,
+            ProductDB.supplier_id,
+            SupplierDB.name,
+            func.count(),
+            func.min(ProductDB.price),
+            func.max(ProductDB.price),
+            func.sum(ProductDB.price),
         )
+        .outerjoin(CategoryDB, CategoryDB.id == ProductDB.categoria_id)
+        .outerjoin(SupplierDB, SupplierDB.id == ProductDB.supplier_id)
+    )
+    if q:
+        query = query.filter(product_search_filter(q))
+    for clause in filters.clauses():
+        query = query.filter(clause)
+    groups = query.group_by(ProductDB.categoria_id, CategoryDB.name, ProductDB.supplier_id, SupplierDB.name).all()
+
+    categories: Dict[int, dict] = {}
+    suppliers: Dict[int, dict] = {}
+    total, price_sum, low, high = 0, 0.0, None, None
+    for categoria_id, categoria, supplier_id, supplier, count, group_min, group_max, group_sum in groups:
+        categories.setdefault(categoria_id, {"id": categoria_id, "name": categoria, "count": 0})["count"] += count
+        suppliers.setdefault(supplier_id, {"id": supplier_id, "name": supplier, "count": 0})["count"] += count
+        total += count
+        price_sum += group_sum
+        low = group_min if low is None else min(low, group_min)
+        high = group_max if high is None else max(high, group_max)
+
+    def ordered(counts: Dict[int, dict]) -> list:
+        return sorted(counts.values(), key=lambda f: (-f["count"], f["name"] or "", f["id"]))
+
+    facets = ProductFacets(
+        total=total,
+        categories=ordered(categories),
+        suppliers=ordered(suppliers),
+        price={"min": low, "max": high, "avg": round(price_sum / total, 2) if total else None},
+    )
+    return facets.model_dump_json().encode()
+
+
+def dump_product_rows(rows) -> bytes:
+    """Serializa filas de PRODUCT_COLUMNS (columnas extra al final se ignoran) en una pasada."""
+    items = [dict(zip(_PRODUCT_FIELDS, row)) for row in rows]
+    return _list_adapter.dump_json(_list_adapter.validate_python(items))
+
+
+def _product_body(row) -> bytes:
+    return _product_adapter.dump_json(_product_adapter.validate_python(dict(zip(_PRODUCT_FIELDS, row))))
+
+
+def _json_list(db: Session, rows: list, response: Response, expand: Sequence[str] = ()) -> Response:
+    if expand:
+        related = _related_bodies(db, expand, rows)
+        content = b"[" + b",".join(_expand_body(_product_body(r), r, expand, related) for r in rows) + b"]"
     else:
-        field = getattr(ProductDB, sort)
-        query = query.order_by(field.asc() if order == "asc" else field.desc())
+        content = dump_product_rows(rows)
+    return Response(content=content, media_type="application/json", headers=dict(response.headers))
 
-    total = query.count()
-    response.headers["X-Total-Count"] = str(total)
 
-    products = query.offset(offset).limit(limit).all()
-    return [Product.model_validate(p) for p in products]
+def _set_total_header(response: Response, total_key: tuple, total: Optional[int], cached: bool):
+    if total is None:
+        return
+    if not cached:
+        _totals.set(total_key, total)
+    response.headers["X-Total-Count"] = str(total)
 
 
 @router.post("", response_model=Product, status_code=201)
@@ -78,10 +366,8 @@ def create_product(
         raise HTTPException(status_code=409, detail="Producto duplicado")
 
     # Casi duplicado segun clave normalizada
-    new_key = _normalize_name(payload.name)
-    for pid, pname in db.query(ProductDB.id, ProductDB.name).all():
-        if _normalize_name(pname) == new_key:
-            raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
+    if _similar_name_exists(db, payload.name):
+        raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
 
     product = ProductDB(
         name=payload.name.strip(),
@@ -91,17 +377,56 @@ def create_product(
     )
 
     db.add(product)
-    db.commit()
+    changes.record(db, "product", "created", product)
+    catalog.touch(db, "products")
+    _commit_or_conflict(db)
     db.refresh(product)
     return Product.model_validate(product)
 
 
-@router.get("/{product_id}", response_model=Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(ProductDB).filter(ProductDB.id == product_id).first()
-    if not product:
+def _product_rows(db: Session, ids: List[int]) -> Dict[int, tuple]:
+    """Filas de PRODUCT_COLUMNS por id, con IN (...) por bloques."""
+    found = {}
+    for start in range(0, len(ids), BATCH_CHUNK_SIZE):
+        for row in db.query(*PRODUCT_COLUMNS).filter(ProductDB.id.in_(ids[start:start + BATCH_CHUNK_SIZE])):
+            found[row.id] = row
+    return found
+
+
+def _product_bodies(db: Session, ids: List[int], expand: Sequence[str] = ()) -> Dict[int, bytes]:
+    """JSON de cada producto existente por id (con las relaciones de `expand`)."""
+    rows = _product_rows(db, ids)
+    related = _related_bodies(db, expand, rows.values()) if expand else {}
+    return {
+        product_id: _expand_body(_product_body(row), row, expand, related) if expand else _product_body(row)
+        for product_id, row in rows.items()
+    }
+
+
+@router.post("/batch-get", response_model=ProductBatch)
+def batch_get_products(
+    payload: ProductBatchRequest,
+    db: Session = Depends(get_read_db),
+    expand: Optional[str] = EXPAND_QUERY,
+):
+    """
+    Varios productos por id en una sola consulta (carritos, cotizaciones).
+    Respeta el orden pedido, omite repetidos y reporta los ids inexistentes.
+    """
+    ids = list(dict.fromkeys(payload.ids))
+    bodies = _product_bodies(db, ids, parse_expand(expand))
+    items = b",".join(bodies[i] for i in ids if i in bodies)
+    missing = [i for i in ids if i not in bodies]
+    content = b'{"items":[' + items + b'],"missing":' + json.dumps(missing).encode() + b"}"
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/{product_id}", response_model=ProductExpanded)
+def get_product(product_id: int, db: Session = Depends(get_read_db), expand: Optional[str] = EXPAND_QUERY):
+    body = _product_bodies(db, [product_id], parse_expand(expand)).get(product_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return Product.model_validate(product)
+    return Response(content=body, media_type="application/json")
 
 
 @router.put("/{product_id}", response_model=Product)
@@ -125,15 +450,15 @@ def update_product(
             raise HTTPException(status_code=409, detail="Ya existe otro producto con ese nombre")
 
         # Casi duplicado segun clave normalizada
-        new_key = _normalize_name(payload.name)
-        for pid, pname in db.query(ProductDB.id, ProductDB.name).filter(ProductDB.id != product_id).all():
-            if _normalize_name(pname) == new_key:
-                raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
+        if _similar_name_exists(db, payload.name, exclude_id=product_id):
+            raise HTTPException(status_code=409, detail="Nombre muy parecido a uno existente")
 
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(product, field, value)
 
-    db.commit()
+    changes.record(db, "product", "updated", product)
+    catalog.touch(db, "products")
+    _commit_or_conflict(db)
     db.refresh(product)
     return Product.model_validate(product)
 
@@ -149,6 +474,8 @@ def delete_product(
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
     db.delete(product)
+    changes.record(db, "product", "deleted", {"id": product_id})
+    catalog.touch(db, "products")
     db.commit()
     return None
 
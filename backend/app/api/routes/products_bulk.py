@@ -0,0 +1,450 @@
+import codecs
+import csv
+import io
+import json
+from typing import Dict, Iterator, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Numeric, case, cast, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import catalog, changes
+from app.auth.dependencies import get_current_user
+from app.core.config import settings
+from app.core.text import normalize_name
+from app.db import SessionLocal, ProductDB, CategoryDB, SupplierDB
+from app.db_routing import read_session
+from app.models.product import ProductCreate, RepriceRequest, RepriceRule
+
+# Operaciones masivas sobre productos (importacion, cambio de precios, exportacion)
+router = APIRouter(prefix="/products", tags=["products"])
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+REPRICE_BATCH_SIZE = 500
+PREVIEW_LIMIT = 100
+EXPORT_CHUNK_SIZE = 1000
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _decode_error_line(upload: UploadFile, encoding: str) -> Optional[int]:
+    """Linea del primer byte que no se puede decodificar con `encoding`, o None."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    upload.file.seek(0)
+    line = 1
+    try:
+        while True:
+            chunk = upload.file.read(64 * 1024)
+            try:
+                decoder.decode(chunk, final=not chunk)
+            except UnicodeDecodeError as exc:
+                return line + chunk.count(b"\n", 0, max(exc.start, 0))
+            if not chunk:
+                return None
+            line += chunk.count(b"\n")
+    finally:
+        upload.file.seek(0)
+
+
+def _resolve_encoding(upload: UploadFile, encoding: Optional[str]) -> str:
+    """
+    Codificacion del archivo, verificada completa antes de guardar el primer
+    lote (una importacion nunca queda a medias por un byte invalido).
+    Sin `encoding`: UTF-8 y, si no decodifica, cp1252 (exportaciones de Excel).
+    """
+    if encoding:
+        try:
+            name = codecs.lookup(encoding).name
+        except LookupError:
+            raise HTTPException(status_code=400, detail=f"Codificacion desconocida: {encoding}")
+        candidates = ["utf-8-sig" if name == "utf-8" else name]
+    else:
+        candidates = ["utf-8-sig", "cp1252"]
+
+    for candidate in candidates:
+        bad_line = _decode_error_line(upload, candidate)
+        if bad_line is None:
+            return candidate
+    expected = encoding or "UTF-8 ni cp1252"
+    raise HTTPException(
+        status_code=400,
+        detail=f"El archivo no esta en {expected}: caracteres invalidos en la linea {bad_line}",
+    )
+
+
+def _iter_rows(upload: UploadFile, fmt: str, encoding: str = "utf-8-sig") -> Iterator[Tuple[int, dict]]:
+    """Lee el archivo linea a linea (memoria constante) como (fila, dict)."""
+    stream = io.TextIOWrapper(upload.file, encoding=encoding, newline="")
+    if fmt == "csv":
+        for line_no, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip()}
+    else:
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                data = None
+            yield line_no, data if isinstance(data, dict) else {"__invalid__": True}
+
+
+def _detect_format(upload: UploadFile, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    name = (upload.filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in (upload.content_type or ""):
+        return "jsonl"
+    return "csv"
+
+
+def _resolve(row: dict, field: str, by_name: Dict[str, int], ids: set) -> Optional[int]:
+    """Acepta el id (`categoria_id`) o el nombre (`categoria`) de la relacion."""
+    raw_id = row.get(f"{field}_id")
+    if raw_id not in (None, ""):
+        try:
+            value = int(raw_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field}_id invalido")
+        if value not in ids:
+            raise ValueError(f"{field}_id {value} no existe")
+        return value
+    raw_name = row.get(field)
+    if raw_name:
+        value = by_name.get(normalize_name(str(raw_name)))
+        if value is None:
+            raise ValueError(f"{field} '{raw_name}' no existe")
+        return value
+    raise ValueError(f"Falta {field} o {field}_id")
+
+
+@router.post("/bulk")
+def bulk_import_products(
+    file: UploadFile = File(..., description="CSV con encabezado o JSONL (un producto por linea)"),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="Por defecto segun la extension"),
+    mode: Literal["insert", "upsert"] = Query("insert", description="upsert actualiza los nombres existentes"),
+    encoding: Optional[str] = Query(
+        None, description="Codificacion del archivo (utf-8, cp1252, latin-1...); por defecto UTF-8 o cp1252"
+    ),
+    db: Session = Depends(get_db),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Importa productos desde un CSV o JSONL en transacciones por lotes.
+    Columnas: name, price, categoria_id o categoria, supplier_id o supplier.
+    """
+    fmt = _detect_format(file, format)
+    encoding = _resolve_encoding(file, encoding)
+
+    # Resolucion de nombres de categoria/proveedor en una sola pasada
+    categories = {normalize_name(n): i for i, n in db.query(CategoryDB.id, CategoryDB.name)}
+    suppliers = {normalize_name(n): i for i, n in db.query(SupplierDB.id, SupplierDB.name)}
+    category_ids, supplier_ids = set(categories.values()), set(suppliers.values())
+
+    report = {"inserted": 0, "updated": 0, "error_count": 0, "errors": []}
+
+    def add_error(line_no: int, message: str):
+        report["error_count"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": line_no, "error": message})
+
+    seen_keys: Dict[str, int] = {}
+    batch: List[Tuple[int, dict]] = []
+
+    def flush():
+        if not batch:
+            return
+        keys = [r["name_key"] for _, r in batch]
+        existing = dict(
+            db.query(ProductDB.name_key, ProductDB.id).filter(ProductDB.name_key.in_(keys)).all()
+        )
+        to_insert, to_update = [], []
+        for line_no, values in batch:
+            product_id = existing.get(values["name_key"])
+            if product_id is None:
+                to_insert.append((line_no, values))
+            elif mode == "upsert":
+                to_update.append((line_no, {"id": product_id, **values}))
+            else:
+                add_error(line_no, "Nombre muy parecido a uno existente")
+        try:
+            if to_insert:
+                db.execute(insert(ProductDB), [values for _, values in to_insert])
+            if to_update:
+                db.execute(update(ProductDB), [values for _, values in to_update])
+            saved = len(to_insert), len(to_update)
+            if to_insert or to_update:
+                catalog.touch(db, "products")
+        except IntegrityError:
+            db.rollback()
+            saved = save_rows(to_insert, to_update)
+        if any(saved):
+            changes.record(db, "product", "imported", {"inserted": saved[0], "updated": saved[1]})
+            db.commit()
+            report["inserted"] += saved[0]
+            report["updated"] += saved[1]
+        else:
+            db.rollback()
+        batch.clear()
+
+    def save_rows(to_insert, to_update) -> Tuple[int, int]:
+        """Reintento fila a fila tras un conflicto: solo se descartan las filas en conflicto."""
+        # touch abre la transaccion antes del primer SAVEPOINT (con pysqlite un
+        # SAVEPOINT inicial seria la transaccion externa y RELEASE la confirmaria)
+        catalog.touch(db, "products")
+        saved = [0, 0]
+        for index, rows, stmt in ((0, to_insert, insert(ProductDB)), (1, to_update, update(ProductDB))):
+            for line_no, values in rows:
+                try:
+                    with db.begin_nested():
+                        db.execute(stmt, [values])
+                except IntegrityError:
+                    add_error(line_no, "Conflicto al guardar (nombre duplicado)")
+                else:
+                    saved[index] += 1
+        return saved[0], saved[1]
+
+    total_rows = 0
+    for line_no, row in _iter_rows(file, fmt, encoding):
+        total_rows += 1
+        if row.get("__invalid__"):
+            add_error(line_no, "JSON invalido")
+            continue
+        try:
+            categoria_id = _resolve(row, "categoria", categories, category_ids)
+            supplier_id = _resolve(row, "supplier", suppliers, supplier_ids)
+            product = ProductCreate.model_validate(
+                {
+                    "name": str(row.get("name", "")).strip(),
+                    "price": row.get("price"),
+                    "categoria_id": categoria_id,
+                    "supplier_id": supplier_id,
+                }
+            )
+        except ValueError as exc:
+            # ValidationError de pydantic tambien es ValueError
+            message = "; ".join(
+                f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()
+            ) if isinstance(exc, ValidationError) else str(exc)
+            add_error(line_no, message)
+            continue
+
+        key = normalize_name(product.name)
+        if not key:
+            add_error(line_no, "Nombre invalido")
+            continue
+        if key in seen_keys:
+            add_error(line_no, f"Duplicado de la fila {seen_keys[key]} en el archivo")
+            continue
+        seen_keys[key] = line_no
+
+        batch.append((line_no, {**product.model_dump(), "name_key": key}))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+
+    if total_rows == 0:
+        raise HTTPException(status_code=400, detail="El archivo no contiene filas")
+    report["total_rows"] = total_rows
+    return report
+
+
+def _rule_price(rule: RepriceRule):
+    """Expresion SQL del nuevo precio segun la regla."""
+    price = ProductDB.price
+    if rule.percent is not None:
+        price = price * (1 + rule.percent / 100.0)
+    if rule.round_to is not None:
+        return func.round(price / rule.round_to) * rule.round_to
+    return func.round(cast(price, Numeric), 2)
+
+
+def _rule_filters(rule: RepriceRule):
+    filters = []
+    if rule.supplier_id is not None:
+        filters.append(ProductDB.supplier_id == rule.supplier_id)
+    if rule.categoria_id is not None:
+        filters.append(ProductDB.categoria_id == rule.categoria_id)
+    return filters
+
+
+@router.post("/reprice")
+def reprice_products(
+    payload: RepriceRequest,
+    db: Session = Depends(get_db),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Cambia precios en bloque: una lista explicita de {id, price} o una regla
+    (porcentaje y/o redondeo) por proveedor o categoria. Con dry_run=true solo
+    devuelve una vista previa sin modificar nada.
+    """
+    if payload.rule is not None:
+        new_price = _rule_price(payload.rule)
+        filters = _rule_filters(payload.rule)
+        affected = db.query(func.count(ProductDB.id)).filter(*filters).scalar()
+        preview = (
+            db.query(ProductDB.id, ProductDB.name, ProductDB.price, new_price)
+            .filter(*filters)
+            .order_by(ProductDB.id)
+            .limit(PREVIEW_LIMIT)
+            .all()
+        )
+        if not payload.dry_run and affected:
+            # Un solo UPDATE basado en conjunto para toda la regla
+            db.execute(
+                update(ProductDB).where(*filters).values(price=new_price),
+                execution_options={"synchronize_session": False},
+            )
+            # Precios nuevos para el evento del stream (solo si son pocos)
+            changed = (
+                db.query(ProductDB.id, ProductDB.price)
+                .filter(*filters)
+                .order_by(ProductDB.id)
+                .limit(settings.CHANGE_STREAM_MAX_ITEMS + 1)
+                .all()
+            )
+        missing_ids: List[int] = []
+    else:
+        prices = {item.id: item.price for item in payload.items}
+        ids = list(prices)
+        found = []
+        for start in range(0, len(ids), REPRICE_BATCH_SIZE):
+            chunk = ids[start:start + REPRICE_BATCH_SIZE]
+            found += db.query(ProductDB.id, ProductDB.name, ProductDB.price).filter(ProductDB.id.in_(chunk)).all()
+            if not payload.dry_run:
+                # UPDATE ... SET price = CASE id WHEN ... END WHERE id IN (...)
+                db.execute(
+                    update(ProductDB)
+                    .where(ProductDB.id.in_(chunk))
+                    .values(price=case({i: prices[i] for i in chunk}, value=ProductDB.id)),
+                    execution_options={"synchronize_session": False},
+                )
+        found_ids = {row.id for row in found}
+        missing_ids = [i for i in ids if i not in found_ids]
+        affected = len(found)
+        preview = [(r.id, r.name, r.price, prices[r.id]) for r in found[:PREVIEW_LIMIT]]
+        changed = [(r.id, prices[r.id]) for r in found]
+
+    if not payload.dry_run and affected:
+        catalog.touch(db, "products")
+        # items=null si son demasiados: los clientes recargan el catalogo
+        items = (
+            [{"id": pid, "price": float(price)} for pid, price in changed]
+            if len(changed) <= settings.CHANGE_STREAM_MAX_ITEMS
+            else None
+        )
+        changes.record(db, "product", "repriced", {"count": affected, "items": items})
+        db.commit()
+
+    return {
+        "dry_run": payload.dry_run,
+        "affected": affected,
+        "missing_ids": missing_ids,
+        "preview": [
+            {"id": pid, "name": name, "old_price": old, "new_price": float(new)}
+            for pid, name, old, new in preview
+        ],
+    }
+
+
+_EXPORT_FIELDS = ["id", "name", "price", "categoria_id", "categoria", "supplier_id", "supplier"]
+_EXPORT_TYPES = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "txt": ("text/plain; charset=utf-8", "txt"),
+}
+
+
+def _export_rows(db: Session) -> Iterator[dict]:
+    """Recorre el catalogo por bloques con un cursor del lado del servidor."""
+    # La sesion se cierra aqui: el generador se consume despues del request
+    try:
+        stmt = (
+            select(
+                ProductDB.id,
+                ProductDB.name,
+                ProductDB.price,
+                ProductDB.categoria_id,
+                CategoryDB.name.label("categoria"),
+                ProductDB.supplier_id,
+                SupplierDB.name.label("supplier"),
+            )
+            .join(CategoryDB, ProductDB.categoria_id == CategoryDB.id)
+            .join(SupplierDB, ProductDB.supplier_id == SupplierDB.id)
+            .order_by(func.lower(CategoryDB.name), ProductDB.name, ProductDB.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        for row in db.execute(stmt):
+            yield row._asdict()
+    finally:
+        db.close()
+
+
+def _format_price(value: float) -> str:
+    # Formato local: separador de miles con punto (8.500)
+    return "$ " + f"{value:,.0f}".replace(",", ".")
+
+
+def _export_csv(rows: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=_EXPORT_FIELDS)
+    writer.writeheader()
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _export_jsonl(rows: Iterator[dict]) -> Iterator[str]:
+    lines = []
+    for i, row in enumerate(rows, start=1):
+        lines.append(json.dumps(row, ensure_ascii=False) + "\n")
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield "".join(lines)
+            lines.clear()
+    yield "".join(lines)
+
+
+def _export_txt(rows: Iterator[dict]) -> Iterator[str]:
+    """Lista de precios imprimible agrupada por categoria."""
+    lines = []
+    current = None
+    for i, row in enumerate(rows, start=1):
+        if row["categoria"] != current:
+            current = row["categoria"]
+            lines.append(f"\n{current.upper()}\n{'=' * 60}\n")
+        price = _format_price(row["price"])
+        lines.append(f"{row['name'][:44]:.<46}{price:.>14}\n")
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield "".join(lines)
+            lines.clear()
+    yield "".join(lines)
+
+
+@router.get("/export")
+def export_products(
+    request: Request,
+    format: Literal["csv", "jsonl", "txt"] = Query("csv", description="csv, jsonl o txt (lista imprimible)"),
+):
+    """Exporta todo el catalogo en streaming, con memoria constante."""
+    media_type, extension = _EXPORT_TYPES[format]
+    writer = {"csv": _export_csv, "jsonl": _export_jsonl, "txt": _export_txt}[format]
+    return StreamingResponse(
+        writer(_export_rows(read_session(request))),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="lista_precios.{extension}"'},
+    )
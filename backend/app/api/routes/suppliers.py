@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from app.db import SessionLocal, SupplierDB, ProductDB 
+from app.db_routing import read_session
 from app.models.supplier import Supplier, SupplierCreate, SupplierUpdate 
 from typing import List
 from app.auth.dependencies import get_current_user
+from app.core.cache import named_cache
+from app.core.config import settings
+from app import catalog, changes
 
 router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 
+# Respuestas JSON ya serializadas; la clave lleva la version de la tabla y
+# clear() solo libera memoria en cada escritura
+_cache = named_cache("suppliers", maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL_SECONDS)
+catalog.on_change("suppliers", _cache.clear)
+_list_adapter = TypeAdapter(List[Supplier])
+
 def get_db():
     db = SessionLocal()
     try:
@@ -14,20 +25,37 @@ def get_db():
     finally:
         db.close()
 
+
+# Sesion para los GET: replica de lectura o primario (ver app.db_routing)
+def get_read_db(request: Request):
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
 # --- Rutas Publicas (para Clientes y Admin) ---
 
 @router.get("", response_model=List[Supplier])
-def list_suppliers(db: Session = Depends(get_db)):
+def list_suppliers(db: Session = Depends(get_read_db)):
     """Lista todos los proveedores."""
-    return db.query(SupplierDB).order_by(SupplierDB.name).all()
+    def load():
+        items = db.query(SupplierDB).order_by(SupplierDB.name).all()
+        return _list_adapter.dump_json(_list_adapter.validate_python(items, from_attributes=True))
+
+    return Response(content=_cache.get_or_set((catalog.version("suppliers"), "list"), load), media_type="application/json")
 
 @router.get("/{supplier_id}", response_model=Supplier)
-def get_supplier(supplier_id: int, db: Session = Depends(get_db)):
+def get_supplier(supplier_id: int, db: Session = Depends(get_read_db)):
     """Obtiene un proveedor por su ID."""
-    supplier = db.query(SupplierDB).filter(SupplierDB.id == supplier_id).first()
-    if not supplier:
+    def load():
+        supplier = db.query(SupplierDB).filter(SupplierDB.id == supplier_id).first()
+        return Supplier.model_validate(supplier).model_dump_json().encode() if supplier else None
+
+    body = _cache.get_or_set((catalog.version("suppliers"), "id", supplier_id), load)
+    if body is None:
         raise HTTPException(status_code=404, detail="Proveedor no encontrado")
-    return supplier
+    return Response(content=body, media_type="application/json")
 
 # --- Rutas Protegidas (Solo Admin) ---
 
@@ -48,6 +76,8 @@ def create_supplier(
         email=payload.email
     )
     db.add(supplier)
+    changes.record(db, "supplier", "created", supplier)
+    catalog.touch(db, "suppliers")
     db.commit()
     db.refresh(supplier)
     return supplier
@@ -77,6 +107,8 @@ def update_supplier(
     for field, value in update_data.items():
         setattr(supplier, field, value)
 
+    changes.record(db, "supplier", "updated", supplier)
+    catalog.touch(db, "suppliers")
     db.commit()
     db.refresh(supplier)
     return supplier
@@ -100,6 +132,8 @@ def delete_supplier(
         )
 
     db.delete(supplier)
+    changes.record(db, "supplier", "deleted", {"id": supplier_id})
+    catalog.touch(db, "suppliers")
     db.commit()
     return None
 
@@ -1,53 +1,37 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from collections import deque
-import time
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.auth.dependencies import (
     SECRET_KEY,
     ALGORITHM,
-    authenticate_user,
     get_db,
-    create_admin_user,
+    get_user_by_username,
     get_current_user,
 )
+from app.auth.hashing import verify_password_async, hash_password_async, needs_rehash
+from app.auth.ratelimit import limiter
 from app.core.config import settings
 
 router = APIRouter(prefix="/login", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-# Limitador simple en memoria por clave
-_attempts: dict[str, deque[float]] = {}
-_RL_MAX = settings.RATE_LIMIT_MAX_ATTEMPTS
+# Limitador de intentos fallidos (store configurable, ver app.auth.ratelimit)
+_login_limiter = limiter("login")
 _RL_WIN = settings.RATE_LIMIT_WINDOW_SECONDS
 
 
-def _prune_and_get_queue(key: str) -> deque:
-    now = time.monotonic()
-    dq = _attempts.setdefault(key, deque())
-    cutoff = now - _RL_WIN
-    while dq and dq[0] < cutoff:
-        dq.popleft()
-    return dq
-
-
 def _check_rate_limit(key: str):
-    dq = _prune_and_get_queue(key)
-    if len(dq) >= _RL_MAX:
-        # Indicar al cliente cuánto esperar como pista
-        raise HTTPException(status_code=429, detail="Muchos intentos fallidos, intenta más tarde.", headers={"Retry-After": str(_RL_WIN)})
+    # Indicar al cliente cuánto esperar como pista
+    _login_limiter.check(key, "Muchos intentos fallidos, intenta más tarde.", headers={"Retry-After": str(_RL_WIN)})
 
 
 def _record_failed_attempt(key: str):
-    now = time.monotonic()
-    dq = _attempts.setdefault(key, deque())
-    dq.append(now)
+    _login_limiter.hit(key)
 
 
 def _client_ip(request: Request) -> str:
@@ -67,26 +51,38 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def _save_rehash(db: Session, user, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+
 @router.post("")
-def login(
+async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
     # Limitar por usuario + IP (solo cuenta intentos fallidos)
     client_ip = _client_ip(request)
-    key = f"login:{form_data.username}:{client_ip}" if getattr(form_data, "username", None) else f"login:{client_ip}"
-    _check_rate_limit(key)
-
-    # Garantiza que exista el admin por defecto (después de chequear límite)
-    create_admin_user(db)
-
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
-        _record_failed_attempt(key)
+    key = f"{form_data.username}:{client_ip}" if getattr(form_data, "username", None) else client_ip
+    await run_in_threadpool(_check_rate_limit, key)
+
+    # El admin por defecto se crea al arrancar (bootstrap_admin), no aqui.
+    # La consulta va al threadpool y bcrypt al pool acotado de hashing.
+    user = await run_in_threadpool(get_user_by_username, db, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
+        await run_in_threadpool(_record_failed_attempt, key)
         raise HTTPException(status_code=401, detail="Credenciales invalidas")
 
-    access_token = create_access_token(data={"sub": user.username})
+    # Migra el hash si cambio el esquema o el costo configurado
+    if needs_rehash(user.hashed_password):
+        new_hash = await hash_password_async(form_data.password)
+        await run_in_threadpool(_save_rehash, db, user, new_hash)
+
+    # uid y ver permiten validar el token contra el usuario cacheado
+    access_token = create_access_token(
+        data={"sub": user.username, "uid": user.id, "ver": user.token_version or 0}
+    )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
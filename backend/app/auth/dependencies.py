@@ -1,19 +1,50 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+import hashlib
+import logging
+import time
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from typing import Optional
 from sqlalchemy.orm import Session
 from app.db import SessionLocal
 from app.db import UserDB
+from app.core.cache import named_cache
 from app.core.config import settings
+from app.auth.hashing import hash_password, verify_password
+from app.db_routing import mark_write
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+logger = logging.getLogger(__name__)
+
+# Usuarios autenticados por `sub` y payloads de tokens ya verificados
+_principals = named_cache(
+    "auth_principals", maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+)
+_tokens = named_cache("auth_tokens", maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Datos del usuario autenticado que necesitan las rutas protegidas."""
+    id: int
+    username: str
+    email: Optional[str]
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: UserDB) -> "Principal":
+        return cls(id=user.id, username=user.username, email=user.email, token_version=user.token_version or 0)
+
+
+def invalidate_principal(username: str):
+    """Descarta el usuario cacheado (llamar tras modificar el usuario)."""
+    _principals.pop(username)
+
 
 # Dependencia para obtener sesion
 def get_db():
@@ -24,25 +55,32 @@ def get_db():
         db.close()
 
 
-# Crear usuario (para inicializar el admin si no existe)
+# Crear usuario (para inicializar el admin si no existe). Se ejecuta una vez
+# al arrancar; solo calcula un hash si hay que crear o corregir la clave.
 def create_admin_user(db: Session):
-    admin = db.query(UserDB).filter(UserDB.username == "admin").first()
-    hashed_pw = pwd_context.hash("1234")
+    username, password = settings.ADMIN_USERNAME, settings.ADMIN_PASSWORD
+    admin = db.query(UserDB).filter(UserDB.username == username).first()
     if not admin:
-        new_admin = UserDB(username="admin", hashed_password=hashed_pw)
+        new_admin = UserDB(username=username, hashed_password=hash_password(password))
         db.add(new_admin)
         db.commit()
         db.refresh(new_admin)
-        print("Usuario admin creado (admin / 1234)")
-    else:
-        # Asegura credenciales conocidas para pruebas/local
-        if not verify_password("1234", admin.hashed_password):
-            admin.hashed_password = hashed_pw # type: ignore
-            db.commit()
+        logger.info("Usuario admin creado: %s", username)
+    elif not verify_password(password, admin.hashed_password):
+        # Asegura credenciales conocidas para pruebas/local; revoca tokens previos
+        admin.hashed_password = hash_password(password) # type: ignore
+        admin.token_version = (admin.token_version or 0) + 1 # type: ignore
+        db.commit()
+        invalidate_principal(username)
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def bootstrap_admin():
+    """Crea o corrige el usuario admin con una sesion propia (arranque)."""
+    db = SessionLocal()
+    try:
+        create_admin_user(db)
+    finally:
+        db.close()
 
 
 def get_user_by_username(db: Session, username: str):
@@ -56,23 +94,51 @@ def authenticate_user(db: Session, username: str, password: str):
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _decode_token(token: str) -> dict:
+    """Verifica la firma del JWT; el resultado se cachea por hash del token."""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = _tokens.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) <= time.time():
+            raise JWTError("Token expirado")
+        return payload
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _tokens.set(key, payload)
+    return payload
+
+
+def get_current_user(
+    request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token invalido o expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         username: Optional[str] = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = get_user_by_username(db, username)
-    if user is None:
-        raise credentials_exception
+    # La sesion solo abre conexion si el usuario no esta en cache
+    principal = _principals.get(username)
+    if principal is None:
+        user = get_user_by_username(db, username)
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        _principals.set(username, principal)
 
-    return user
+    # Tokens con version anterior (p. ej. antes de un cambio de clave) se rechazan
+    if "uid" in payload and payload["uid"] != principal.id:
+        raise credentials_exception
+    if "ver" in payload and payload["ver"] != principal.token_version:
+        raise credentials_exception
 
+    # Escrituras autenticadas: sus lecturas siguientes van al primario
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        mark_write(principal.username)
+    return principal
@@ -0,0 +1,50 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+# ---------------------------------------------------------------
+# Hash de contrasenas configurable (bcrypt por defecto, argon2 opcional)
+#
+# bcrypt/argon2 son lentos a proposito. Se ejecutan en un pool de hilos
+# acotado (PASSWORD_HASH_WORKERS) para que no bloqueen el event loop ni
+# agoten el threadpool de FastAPI. Ambos liberan el GIL, asi que los hilos
+# si corren en paralelo.
+
+_schemes = [settings.PASSWORD_HASH_SCHEME]
+if settings.PASSWORD_HASH_SCHEME != "bcrypt":
+    # Hashes bcrypt existentes siguen validando y se migran al iniciar sesion
+    _schemes.append("bcrypt")
+
+pwd_context = CryptContext(
+    schemes=_schemes,
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+
+
+def hash_password(password: str) -> str:
+    return _executor.submit(pwd_context.hash, password).result()
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _executor.submit(pwd_context.verify, plain_password, hashed_password).result()
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si el hash usa un esquema o costo distinto al configurado."""
+    return pwd_context.needs_update(hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.verify, plain_password, hashed_password)
@@ -0,0 +1,139 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.core.config import settings
+
+# ---------------------------------------------------------------
+# Limitador de intentos con ventana deslizante aproximada
+#
+# Cada clave guarda solo tres numeros: la ventana fija actual y los conteos
+# de la ventana actual y la anterior. El conteo estimado pondera la ventana
+# anterior por la fraccion que todavia cae dentro de la ventana deslizante,
+# asi la memoria por clave es O(1) sin importar cuantos intentos haya.
+#
+# Stores:
+#   MemoryStore   - por proceso, con expulsion LRU global (RATE_LIMIT_MAX_KEYS)
+#   DatabaseStore - tabla rate_limits en la base; compartido entre workers
+
+State = Tuple[int, int, int]  # (ventana, conteo_anterior, conteo_actual)
+
+
+def _roll(state: Optional[State], window_index: int) -> State:
+    """Avanza el estado a la ventana actual."""
+    if state is None:
+        return (window_index, 0, 0)
+    win, prev, curr = state
+    if win == window_index:
+        return state
+    if win == window_index - 1:
+        return (window_index, curr, 0)
+    return (window_index, 0, 0)
+
+
+class MemoryStore:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._data: "OrderedDict[str, State]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, window_index: int) -> State:
+        with self._lock:
+            state = self._data.get(key)
+            return _roll(state, window_index)
+
+    def hit(self, key: str, window_index: int) -> None:
+        with self._lock:
+            win, prev, curr = _roll(self._data.get(key), window_index)
+            self._data[key] = (win, prev, curr + 1)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DatabaseStore:
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._hits = 0
+
+    def get(self, key: str, window_index: int) -> State:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT win, prev, curr FROM rate_limits WHERE key = :k"), {"k": key}
+            ).first()
+        return _roll(tuple(row) if row else None, window_index)
+
+    def hit(self, key: str, window_index: int) -> None:
+        # UPSERT atomico: los SET ven los valores anteriores de la fila
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO rate_limits (key, win, prev, curr) VALUES (:k, :w, 0, 1) "
+                    "ON CONFLICT (key) DO UPDATE SET "
+                    "prev = CASE WHEN rate_limits.win = :w THEN rate_limits.prev "
+                    "WHEN rate_limits.win = :w - 1 THEN rate_limits.curr ELSE 0 END, "
+                    "curr = CASE WHEN rate_limits.win = :w THEN rate_limits.curr + 1 ELSE 1 END, "
+                    "win = :w"
+                ),
+                {"k": key, "w": window_index},
+            )
+            self._hits += 1
+            if self._hits % self.CLEANUP_EVERY == 0:
+                # Claves sin actividad en las dos ultimas ventanas ya no cuentan
+                conn.execute(text("DELETE FROM rate_limits WHERE win < :w - 1"), {"w": window_index})
+
+
+class RateLimiter:
+    def __init__(self, name: str, max_attempts: int, window_seconds: int, store):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.window = window_seconds
+        self.store = store
+
+    def _window(self, now: float) -> Tuple[int, float]:
+        index = math.floor(now / self.window)
+        return index, (now - index * self.window) / self.window
+
+    def count(self, key: str) -> float:
+        """Intentos estimados dentro de la ultima ventana deslizante."""
+        index, elapsed = self._window(time.time())
+        _, prev, curr = self.store.get(f"{self.name}:{key}", index)
+        return prev * (1 - elapsed) + curr
+
+    def hit(self, key: str) -> None:
+        index, _ = self._window(time.time())
+        self.store.hit(f"{self.name}:{key}", index)
+
+    def check(self, key: str, detail: str, headers: Optional[dict] = None) -> None:
+        """Lanza 429 si la clave alcanzo el limite."""
+        if self.count(key) >= self.max_attempts:
+            raise HTTPException(status_code=429, detail=detail, headers=headers)
+
+
+def _build_store():
+    if settings.RATE_LIMIT_BACKEND == "database":
+        from app.db import engine
+        return DatabaseStore(engine)
+    return MemoryStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+store = _build_store()
+
+
+def limiter(name: str) -> RateLimiter:
+    return RateLimiter(
+        name,
+        max_attempts=settings.RATE_LIMIT_MAX_ATTEMPTS,
+        window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+        store=store,
+    )
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import engine
+
+# ---------------------------------------------------------------
+# Version del catalogo por tabla (products, categories, suppliers)
+#
+# Cada escritura llama a touch(db, tabla) antes del commit: la version se
+# incrementa en la misma transaccion. Los lectores consultan una copia en
+# memoria que se refresca desde la base como maximo cada
+# CATALOG_VERSION_REFRESH_SECONDS, asi varios workers ven los cambios de los
+# demas sin consultar la base en cada peticion.
+
+TABLES = ("products", "categories", "suppliers")
+
+_lock = threading.Lock()
+_state: Dict[str, Tuple[int, Optional[float]]] = {}
+_loaded_at = 0.0
+_listeners: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+
+
+def on_change(table: str, callback: Callable[[], None]) -> None:
+    """Registra una funcion que se ejecuta cuando cambia la tabla indicada."""
+    _listeners[table].append(callback)
+
+
+def touch(db: Session, *tables: str) -> None:
+    """Marca tablas como modificadas dentro de la transaccion actual."""
+    now = time.time()
+    for table in tables:
+        updated = db.execute(
+            text("UPDATE catalog_versions SET version = version + 1, updated_at = :now WHERE name = :n"),
+            {"n": table, "now": now},
+        )
+        if updated.rowcount == 0:
+            db.execute(
+                text("INSERT INTO catalog_versions (name, version, updated_at) VALUES (:n, 1, :now)"),
+                {"n": table, "now": now},
+            )
+    db.info.setdefault("catalog_changed", set()).update(tables)
+
+
+def _notify(tables: Iterable[str]) -> None:
+    for table in tables:
+        for callback in _listeners.get(table, ()):
+            callback()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    changed = session.info.pop("catalog_changed", None)
+    if changed:
+        global _loaded_at
+        with _lock:
+            _loaded_at = 0.0  # fuerza relectura en la siguiente consulta
+        _notify(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop("catalog_changed", None)
+
+
+def _reload() -> None:
+    global _loaded_at
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT name, version, updated_at FROM catalog_versions")).all()
+    fresh = {name: (version, updated_at) for name, version, updated_at in rows}
+
+    with _lock:
+        # Cambios hechos por otros procesos: invalidar caches locales
+        remote = [t for t, v in fresh.items() if _state and _state.get(t, (0, None))[0] != v[0]]
+        _state.clear()
+        _state.update(fresh)
+        _loaded_at = time.monotonic()
+    _notify(remote)
+
+
+def versions(tables: Iterable[str] = TABLES) -> Tuple[Tuple[int, ...], Optional[float]]:
+    """Devuelve (versiones, ultima modificacion) para las tablas indicadas."""
+    if time.monotonic() - _loaded_at > settings.CATALOG_VERSION_REFRESH_SECONDS:
+        _reload()
+    with _lock:
+        states = [_state.get(t, (0, None)) for t in tables]
+    stamps = [updated for _, updated in states if updated is not None]
+    return tuple(v for v, _ in states), (max(stamps) if stamps else None)
+
+
+def version(table: str) -> int:
+    """
+    Version actual de una tabla. Se lee antes de cargar un valor cacheable y
+    va en la clave: si una escritura confirma durante la carga, el valor queda
+    guardado con la version vieja y nadie lo vuelve a leer.
+    """
+    return versions((table,))[0][0]
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import catalog
+from app.core.config import settings
+from app.db import engine, ChangeLogDB
+from app.models.category import Category
+from app.models.product import Product
+from app.models.supplier import Supplier
+
+# ---------------------------------------------------------------
+# Stream de cambios del catalogo (GET /catalog/events)
+#
+# Los handlers llaman a record(db, entidad, accion, objeto) junto a
+# catalog.touch(): el evento se guarda en catalog_changes en la misma
+# transaccion que la escritura. Tras el commit, catalog.on_change avisa al
+# broker, que despierta a su hilo lector: este lee las filas nuevas y las
+# reparte a los suscriptores (el hook de commit no hace E/S, porque con
+# ASYNC_DB corre en el loop de eventos). Los
+# cambios hechos por otros workers llegan igual: catalog.versions() detecta la
+# version remota y dispara el mismo aviso.
+#
+# Cada suscriptor tiene una cola acotada; si se llena (cliente lento) se
+# vacia y se cierra su conexion, y el cliente reanuda desde Last-Event-ID
+# leyendo el registro, sin frenar al resto ni crecer en memoria.
+
+logger = logging.getLogger(__name__)
+
+_SCHEMAS = {"product": Product, "category": Category, "supplier": Supplier}
+
+
+class Change(NamedTuple):
+    id: int
+    frame: bytes  # evento SSE ya serializado (se comparte entre suscriptores)
+
+
+def _frame(id_: int, entity: str, action: str, entity_id: Optional[int], data: str, created_at: float) -> bytes:
+    envelope = (
+        f'{{"type":{json.dumps(f"{entity}.{action}")},"id":{json.dumps(entity_id)},'
+        f'"at":{created_at:.3f},"data":{data}}}'
+    )
+    return f"id: {id_}\ndata: {envelope}\n\n".encode()
+
+
+def record(db: Session, entity: str, action: str, target: Union[dict, object]) -> None:
+    """
+    Registra un cambio en la transaccion actual. `target` es la entidad ORM
+    (se serializa al confirmar, ya con id) o un dict con los datos del evento.
+    """
+    db.info.setdefault("catalog_events", []).append((entity, action, target))
+
+
+_writes = 0
+
+
+@event.listens_for(Session, "before_commit")
+def _write_log(session: Session):
+    global _writes
+    pending = session.info.pop("catalog_events", None)
+    if not pending:
+        return
+    session.flush()  # ids de las entidades nuevas
+    now = time.time()
+    rows = []
+    for entity, action, target in pending:
+        if isinstance(target, dict):
+            data = target
+        else:
+            data = _SCHEMAS[entity].model_validate(target).model_dump(mode="json")
+        rows.append({
+            "entity": entity,
+            "action": action,
+            "entity_id": data.get("id"),
+            "data": json.dumps(data, separators=(",", ":")),
+            "created_at": now,
+        })
+    session.execute(insert(ChangeLogDB), rows)
+
+    _writes += 1
+    if _writes % 100 == 0:
+        # Poda periodica: se conservan las ultimas CHANGE_LOG_RETENTION filas
+        newest = session.scalar(select(func.max(ChangeLogDB.id)))
+        session.execute(delete(ChangeLogDB).where(ChangeLogDB.id <= newest - settings.CHANGE_LOG_RETENTION))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop("catalog_events", None)
+
+
+def _load(conn, after_id: int) -> List[Change]:
+    rows = conn.execute(
+        select(
+            ChangeLogDB.id,
+            ChangeLogDB.entity,
+            ChangeLogDB.action,
+            ChangeLogDB.entity_id,
+            ChangeLogDB.data,
+            ChangeLogDB.created_at,
+        )
+        .where(ChangeLogDB.id > after_id)
+        .order_by(ChangeLogDB.id)
+    ).all()
+    return [Change(row[0], _frame(*row)) for row in rows]
+
+
+def since(last_id: int) -> Tuple[List[Change], bool]:
+    """Cambios posteriores a last_id y si hay que reiniciar (el id ya fue podado o no existe)."""
+    with engine.connect() as conn:
+        oldest, newest = conn.execute(select(func.min(ChangeLogDB.id), func.max(ChangeLogDB.id))).one()
+        if newest is None or last_id > newest:
+            return [], last_id > (newest or 0)
+        if last_id < oldest - 1:
+            return _load(conn, oldest - 1), True
+        return _load(conn, last_id), False
+
+
+# --- Broker en proceso ---
+
+OVERFLOW = object()  # marca en la cola: el suscriptor se quedo atras
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, changes: List[Change]) -> bool:
+        """Encola sin bloquear (en el loop del suscriptor); False si desborda."""
+        if self.overflowed:
+            return True  # ya se le pidio reconectar
+        for change in changes:
+            try:
+                self.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                # Se descarta lo pendiente: el cliente reanuda desde su ultimo id
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(OVERFLOW)
+                self.overflowed = True
+                return False
+        return True
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: set = set()
+        self._last_id = 0
+        self._wake = threading.Event()
+        self._reader: Optional[threading.Thread] = None
+        self.published = 0
+        self.overflows = 0
+
+    def full(self) -> bool:
+        """True si se alcanzo CHANGE_STREAM_MAX_SUBSCRIBERS."""
+        return len(self._subscribers) >= settings.CHANGE_STREAM_MAX_SUBSCRIBERS
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> Optional[Subscriber]:
+        """Nuevo suscriptor, o None si se alcanzo CHANGE_STREAM_MAX_SUBSCRIBERS."""
+        with self._lock:
+            if self.full():
+                return None
+            if not self._subscribers:
+                # Sin suscriptores no se sigue el registro: se parte del ultimo id
+                with engine.connect() as conn:
+                    self._last_id = conn.scalar(select(func.max(ChangeLogDB.id))) or 0
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._run, name="catalog-changes", daemon=True)
+                self._reader.start()
+            subscriber = Subscriber(loop, settings.CHANGE_STREAM_QUEUE_SIZE)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def poll(self) -> None:
+        """Aviso de cambios (desde after_commit): solo despierta al hilo lector."""
+        if self._subscribers:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()  # los avisos que lleguen durante la lectura la repiten
+            try:
+                self._publish()
+            except Exception:
+                logger.exception("No se pudo leer el registro de cambios")
+
+    def _publish(self) -> None:
+        """Lee los cambios nuevos del registro y los reparte (una lectura para todos)."""
+        with self._lock:
+            if not self._subscribers:
+                return
+            with engine.connect() as conn:
+                changes = _load(conn, self._last_id)
+            if not changes:
+                return
+            self._last_id = changes[-1].id
+            self.published += len(changes)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, changes)
+            except RuntimeError:  # loop cerrado: la conexion ya termino
+                self.unsubscribe(subscriber)
+
+    def _deliver(self, subscriber: Subscriber, changes: List[Change]) -> None:
+        if not subscriber.offer(changes):
+            self.overflows += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+            "last_id": self._last_id,
+        }
+
+
+broker = Broker()
+for _table in catalog.TABLES:
+    catalog.on_change(_table, broker.poll)
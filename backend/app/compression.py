@@ -0,0 +1,153 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # brotli es opcional: sin el paquete solo se negocia gzip
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+# ---------------------------------------------------------------
+# Compresion negociada (br / gzip) para respuestas de texto y JSON
+#
+# Elige la codificacion segun Accept-Encoding (respetando q=0), solo comprime
+# tipos de texto y cuerpos de al menos COMPRESSION_MINIMUM_SIZE bytes, y
+# funciona tambien con StreamingResponse (exportacion; no con server-sent
+# events, que se envian sin comprimir). El ETag se marca como
+# debil (W/) porque el cuerpo enviado ya no es byte a byte el original;
+# http_cache acepta ETags debiles en If-None-Match.
+
+_COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+
+def _accepted(header: str) -> dict:
+    """Codificaciones nombradas con su q (incluidas las rechazadas con q=0)."""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = _accepted(header)
+    # `*` solo admite las codificaciones que el encabezado no nombra
+    quality = {e: accepted.get(e, accepted.get("*", 0)) for e in (("br",) if brotli is not None else ()) + ("gzip",)}
+    options = [e for e, q in quality.items() if q > 0]
+    if not options:
+        return None
+    # Mayor q; a igual q se prefiere br (mejor razon de compresion para JSON)
+    return max(options, key=quality.get)
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self.compress, self._finish = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = formato gzip
+            self.compress, self._finish = self._compressor.compress, self._compressor.flush
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message = {}
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+        pending = b""  # cuerpo retenido hasta saber si supera el umbral
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough, pending
+            if message["type"] == "http.response.start":
+                start = message  # se envia al decidir la codificacion
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or not content_type.startswith(_COMPRESSIBLE)
+                    # Server-sent events: cada evento debe salir al instante, sin buffer
+                    or content_type.startswith("text/event-stream")
+                )
+                if passthrough:
+                    await send(start)
+                else:
+                    headers.add_vary_header("Accept-Encoding")
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                # Algunos middlewares reenvian el cuerpo en varios bloques: se
+                # acumula hasta alcanzar el umbral o el final de la respuesta
+                pending += body
+                if more_body and len(pending) < self.minimum_size:
+                    return
+                body, pending = pending, b""
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                else:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            chunk = encoder.compress(body)
+            if not more_body:
+                chunk += encoder.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
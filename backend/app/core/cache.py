@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache en memoria con expiracion (TTL) y tamano maximo (LRU). Con
+    `maxweight` ademas se acota la suma de `weigh(valor)` (p. ej. filas).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        maxweight: Optional[int] = None,
+        weigh: Callable[[Any], int] = len,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value, weight = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.weight -= weight
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Lectura a traves del cache: si no hay valor, lo calcula y lo guarda."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        weight = self.weigh(value) if self.maxweight is not None else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.weight -= old[2]
+            if self.maxweight is not None and weight > self.maxweight:
+                return  # no entra ni vaciando el cache
+            self._data[key] = (time.monotonic() + self.ttl, value, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (self.maxweight is not None and self.weight > self.maxweight):
+                self.weight -= self._data.popitem(last=False)[1][2]
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self.weight -= item[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def stats(self) -> dict:
+        stats = {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+        if self.maxweight is not None:
+            stats.update(weight=self.weight, maxweight=self.maxweight)
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Registro de caches con nombre (para exponer sus contadores)
+caches: Dict[str, TTLCache] = {}
+
+
+def named_cache(name: str, maxsize: int, ttl: float) -> TTLCache:
+    cache = caches.get(name)
+    if cache is None:
+        cache = caches[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+    return cache
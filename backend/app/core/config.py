@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
@@ -12,12 +12,104 @@ class Settings(BaseSettings):
     # Limitacion de rate (para endpoints criticos como /login)
     RATE_LIMIT_MAX_ATTEMPTS: int = 5
     RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # "memory" (por proceso) o "database" (compartido entre workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    # Maximo de claves en memoria (expulsion LRU)
+    RATE_LIMIT_MAX_KEYS: int = 10000
+
+    # Hash de contrasenas: "bcrypt" o "argon2" (requiere argon2-cffi)
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Cache de usuarios autenticados (por `sub`) y de tokens ya verificados
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_SIZE: int = 1024
+
+    # Usuario administrador inicial (se crea al arrancar, no en cada login)
+    ADMIN_USERNAME: str = "admin"
+    ADMIN_PASSWORD: str = "1234"
 
     # Codigo de invitacion para registro (control de acceso basico)
     INVITE_CODE: str = "BUrBAN02o25"
 
     # Base de datos
     DATABASE_URL: str = "sqlite:///./products.db"
+    # Replica de solo lectura para los GET del catalogo (vacio = usar DATABASE_URL)
+    READ_DATABASE_URL: Optional[str] = None
+    # Tras escribir, el mismo usuario lee del primario durante esta ventana
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Retraso maximo esperado de la replica: tras cualquier cambio del catalogo
+    # todos leen del primario, asi los caches no se llenan con datos viejos
+    READ_REPLICA_MAX_LAG_SECONDS: float = 2.0
+    # Handlers CRUD async (requiere aiosqlite, o asyncpg para Postgres)
+    ASYNC_DB: bool = False
+
+    # Preparar la base (esquema, semillas, admin) en el arranque de cada worker;
+    # en despliegues con varios workers puede desactivarse y usar python -m app.manage setup
+    DB_AUTO_INIT: bool = True
+    # Lock entre procesos para la inicializacion (vacio = junto al archivo SQLite)
+    DB_INIT_LOCK_FILE: Optional[str] = None
+
+    # Perfil del engine: "tuned" (pool explicito + PRAGMAs) o "default" (SQLAlchemy tal cual)
+    DB_ENGINE_PROFILE: str = "tuned"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_SQLITE_JOURNAL_MODE: str = "WAL"
+    DB_SQLITE_SYNCHRONOUS: str = "NORMAL"
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    DB_SQLITE_CACHE_SIZE: int = -65536  # negativo = KiB (64 MiB)
+    DB_SQLITE_MMAP_SIZE: int = 268435456  # 256 MiB
+    DB_SQLITE_TEMP_STORE: str = "MEMORY"
+
+    # Cache del total de productos (X-Total-Count) por busqueda
+    PRODUCT_TOTAL_CACHE_TTL_SECONDS: int = 30
+    PRODUCT_TOTAL_CACHE_SIZE: int = 1024
+
+    # Stream de cambios del catalogo (GET /catalog/events, server-sent events)
+    CHANGE_STREAM_QUEUE_SIZE: int = 256  # eventos pendientes por suscriptor; al llenarse se desconecta
+    CHANGE_STREAM_MAX_SUBSCRIBERS: int = 1000
+    CHANGE_STREAM_KEEPALIVE_SECONDS: float = 15.0
+    CHANGE_STREAM_MAX_SECONDS: float = 3600.0  # vida maxima de una conexion (el cliente reconecta)
+    CHANGE_STREAM_MAX_ITEMS: int = 500  # precios incluidos en un evento de cambio masivo
+    CHANGE_LOG_RETENTION: int = 10000  # filas que se conservan en catalog_changes
+
+    # Facetas del listado (GET /products/facets) por busqueda y filtros
+    PRODUCT_FACETS_CACHE_TTL_SECONDS: int = 60
+    PRODUCT_FACETS_CACHE_SIZE: int = 512
+
+    # Cache de datos de referencia (categorias y proveedores) ya serializados
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    CATALOG_CACHE_SIZE: int = 512
+
+    # Snapshot en memoria del catalogo publico (GET /products); busquedas cacheadas por
+    # snapshot, acotadas en cantidad y en filas totales (4 bytes por fila)
+    CATALOG_SNAPSHOT_ENABLED: bool = True
+    CATALOG_SNAPSHOT_SEARCH_CACHE_SIZE: int = 256
+    CATALOG_SNAPSHOT_SEARCH_CACHE_ROWS: int = 1_000_000
+
+    # Version del catalogo: cada cuanto se relee desde la base (multiples workers)
+    CATALOG_VERSION_REFRESH_SECONDS: float = 1.0
+
+    # HTTP cache de los GET publicos (max-age en segundos; 0 = siempre revalidar)
+    HTTP_CACHE_MAX_AGE: int = 0
+
+    # Compresion negociada (br requiere el paquete brotli) y JSON rapido
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Serializa las respuestas JSON con orjson / pydantic-core en lugar de json.dumps
+    FAST_JSON_RESPONSES: bool = False
+
+    # Metricas por ruta (/metrics, Server-Timing) y log de consultas lentas
+    METRICS_ENABLED: bool = True
+    METRICS_SERVER_TIMING: bool = True
+    METRICS_SLOW_QUERY_MS: float = 200.0
 
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
@@ -0,0 +1,27 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+try:  # orjson es opcional; pydantic_core.to_json cubre el mismo caso sin dependencias
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+# ---------------------------------------------------------------
+# Respuesta JSON rapida (opt-in con FAST_JSON_RESPONSES=true)
+#
+# JSONResponse usa json.dumps sobre lo que FastAPI ya convirtio a tipos
+# basicos; aqui se serializa con orjson (o el serializador de pydantic-core),
+# que escribe bytes directamente. La salida es JSON equivalente.
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
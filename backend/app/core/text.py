@@ -0,0 +1,12 @@
+import re
+import unicodedata
+
+
+def normalize_name(value: str) -> str:
+    """Clave normalizada de un nombre: minusculas, sin tildes ni signos."""
+    s = value.strip().lower()
+    s = unicodedata.normalize("NFKD", s)
+    s = s.encode("ascii", "ignore").decode("ascii")
+    s = re.sub(r"[^a-z0-9\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
@@ -1,13 +1,81 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, ForeignKey, Index, Text, func
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, validates
 from app.core.config import settings
+from app.core.text import normalize_name
+from app.metrics import CountingConnection
 
 # ---------------------------------------------------------------
 # Configuracion de la base de datos SQLite
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or "mode=memory" in url or url.rstrip("/").endswith("sqlite:"))
+
+
+def engine_options(url: str) -> dict:
+    """Opciones de create_engine segun el perfil configurado (DB_ENGINE_PROFILE)."""
+    options: dict = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if settings.METRICS_ENABLED:
+            # Cursor que cuenta filas leidas para /metrics (solo pysqlite)
+            options["connect_args"]["factory"] = CountingConnection
+    if settings.DB_ENGINE_PROFILE != "tuned" or _is_memory_sqlite(url):
+        return options
+
+    # Pool explicito: debe cubrir los hilos del threadpool de FastAPI (40 por
+    # defecto) para que ningun hilo quede esperando conexion indefinidamente
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    if not url.startswith("sqlite"):
+        options.update(pool_pre_ping=settings.DB_POOL_PRE_PING, pool_recycle=settings.DB_POOL_RECYCLE)
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """PRAGMAs por conexion: WAL para lectores concurrentes con un escritor."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.DB_SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.DB_SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {settings.DB_SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size = {int(settings.DB_SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.DB_SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA temp_store = {settings.DB_SQLITE_TEMP_STORE}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(sync_engine) -> None:
+    """Registra los PRAGMAs de SQLite en un engine (tambien el sync_engine de uno async)."""
+    url = str(sync_engine.url)
+    if settings.DB_ENGINE_PROFILE == "tuned" and url.startswith("sqlite") and not _is_memory_sqlite(url):
+        event.listen(sync_engine, "connect", set_sqlite_pragmas)
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+configure_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Replica de lectura opcional (READ_DATABASE_URL); sin ella se lee del primario
+READ_DATABASE_URL = settings.READ_DATABASE_URL or DATABASE_URL
+if READ_DATABASE_URL == DATABASE_URL:
+    read_engine = engine
+else:
+    read_engine = create_engine(READ_DATABASE_URL, **engine_options(READ_DATABASE_URL))
+    configure_engine(read_engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _reject_writes(session, flush_context, instances):
+    raise RuntimeError("Sesion de solo lectura: las escrituras van al primario")
+
+
 Base = declarative_base()
 
 # ---------------------------------------------------------------
@@ -21,6 +89,11 @@ class CategoryDB(Base):
 
     products = relationship("ProductDB", back_populates="category")
 
+    __table_args__ = (
+        # Respaldan el orden sort=categoria (lower(name) + productos por categoria)
+        Index("ix_categories_lower_name", func.lower(name)),
+    )
+
 
 class SupplierDB(Base):
     __tablename__ = "suppliers"
@@ -38,14 +111,35 @@ class ProductDB(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
+    # Clave normalizada (sin tildes ni signos) para detectar casi duplicados
+    name_key = Column(String, unique=True, index=True, nullable=True)
     price = Column(Float, nullable=False)
 
     categoria_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
-    supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False)
+    supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False, index=True)
 
     category = relationship("CategoryDB", back_populates="products")
     supplier = relationship("SupplierDB", back_populates="products")
 
+    __table_args__ = (
+        # Indices compuestos para la paginacion por cursor (clave de orden + id)
+        Index("ix_products_price_id", price, id),
+        Index("ix_products_categoria_id_id", categoria_id, id),
+        # categoria_id (FK) y price quedan cubiertos como prefijo de los indices
+        # compuestos; lower(name) respalda la validacion de duplicados
+        Index("ix_products_categoria_id_name", categoria_id, name),
+        Index("ix_products_lower_name", func.lower(name)),
+        # Filtros por faceta: categoria o proveedor con rango / orden de precio
+        Index("ix_products_categoria_id_price", categoria_id, price, id),
+        Index("ix_products_supplier_id_price", supplier_id, price, id),
+    )
+
+    @validates("name")
+    def _sync_name_key(self, key, value):
+        # Mantiene name_key sincronizado en cada insert/update del nombre
+        self.name_key = normalize_name(value) if value is not None else None
+        return value
+
 
 # --- NUEVO MODELO: Usuarios ---
 class UserDB(Base):
@@ -55,13 +149,53 @@ class UserDB(Base):
     username = Column(String, unique=True, nullable=False, index=True)
     email = Column(String, unique=True, nullable=True)
     hashed_password = Column(String, nullable=False)
+    # Se incrementa para invalidar los tokens emitidos antes (cambio de clave)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+# Version por tabla del catalogo (ETag / Last-Modified e invalidacion de caches)
+class CatalogVersionDB(Base):
+    __tablename__ = "catalog_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=True)
+
+# Registro de cambios del catalogo para el stream de eventos (reanudar con Last-Event-ID)
+class ChangeLogDB(Base):
+    __tablename__ = "catalog_changes"
+    # AUTOINCREMENT: los ids no se reutilizan despues de podar filas viejas
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    action = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    data = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)
+
+# Contadores del limitador de intentos (RATE_LIMIT_BACKEND=database)
+class RateLimitDB(Base):
+    __tablename__ = "rate_limits"
+
+    key = Column(String, primary_key=True)
+    win = Column(Integer, nullable=False)
+    prev = Column(Integer, nullable=False, default=0)
+    curr = Column(Integer, nullable=False, default=0)
 
 # ---------------------------------------------------------------
 # FUNCIONES DE INICIALIZACION
 
 def init_db():
-    """Crea las tablas si no existen."""
+    """Crea las tablas si no existen y aplica migraciones pendientes."""
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+
+
+def migrate_db():
+    """Aplica las migraciones versionadas pendientes (ver app.migrations)."""
+    # Importado aqui para evitar ciclo con app.migrations
+    from app.migrations import upgrade
+    return upgrade()
 
 
 def seed_data():
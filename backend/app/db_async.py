@@ -0,0 +1,46 @@
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db import configure_engine, engine_options
+from app import catalog
+
+# ---------------------------------------------------------------
+# Capa asincrona de base de datos (aiosqlite en local, asyncpg en Postgres)
+#
+# Reutiliza los modelos de app.db; solo cambia el driver. Se activa con
+# ASYNC_DB=true y requiere instalar el driver correspondiente.
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Convierte una URL sincrona (sqlite://, postgresql://) a su driver async."""
+    scheme, sep, rest = url.partition("://")
+    base = scheme.split("+", 1)[0]
+    return _ASYNC_DRIVERS.get(base, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = async_database_url(settings.DATABASE_URL)
+
+_options = engine_options(ASYNC_DATABASE_URL)
+_options.pop("connect_args", None)  # check_same_thread no aplica a aiosqlite
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_options)
+configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+# Dependencia para obtener sesion asincrona
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def touch(db: AsyncSession, *tables: str) -> None:
+    """Version asincrona de catalog.touch (misma transaccion que la escritura)."""
+    await db.run_sync(lambda session: catalog.touch(session, *tables))
@@ -0,0 +1,61 @@
+import time
+from typing import Optional
+
+from fastapi import Request
+from jose import JWTError
+from sqlalchemy.orm import Session
+
+from app import catalog
+from app.core.cache import named_cache
+from app.core.config import settings
+from app.db import SessionLocal, ReadSessionLocal, engine, read_engine
+
+# ---------------------------------------------------------------
+# Enrutamiento lectura/escritura
+#
+# Las escrituras usan siempre SessionLocal (primario). Los GET del catalogo
+# usan read_session(request), que devuelve una sesion de la replica salvo:
+#   - el catalogo cambio hace menos de READ_REPLICA_MAX_LAG_SECONDS: la replica
+#     puede no tener el cambio y los caches/ETag se llenarian con datos viejos
+#   - el usuario del token escribio hace menos de READ_YOUR_WRITES_SECONDS
+# La marca por usuario vive en memoria del proceso; el cambio del catalogo se
+# comparte entre workers via catalog_versions.
+
+REPLICA_ENABLED = read_engine is not engine
+
+_recent_writers = named_cache(
+    "read_your_writes", maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.READ_YOUR_WRITES_SECONDS
+)
+
+
+def mark_write(username: str) -> None:
+    """Fija las lecturas de este usuario al primario durante la ventana."""
+    if REPLICA_ENABLED:
+        _recent_writers.set(username, True)
+
+
+def _request_user(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    # Importado aqui para evitar ciclo con app.auth.dependencies
+    from app.auth.dependencies import _decode_token
+    try:
+        return _decode_token(token).get("sub")
+    except JWTError:
+        return None
+
+
+def use_primary(request: Request) -> bool:
+    if not REPLICA_ENABLED:
+        return True
+    _, last_modified = catalog.versions()
+    if last_modified is not None and time.time() - last_modified < settings.READ_REPLICA_MAX_LAG_SECONDS:
+        return True
+    username = _request_user(request)
+    return username is not None and _recent_writers.get(username) is not None
+
+
+def read_session(request: Request) -> Session:
+    """Sesion para un GET: replica de solo lectura o primario segun use_primary."""
+    return SessionLocal() if use_primary(request) else ReadSessionLocal()
@@ -0,0 +1,89 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app import catalog
+from app.core.config import settings
+
+# ---------------------------------------------------------------
+# Peticiones condicionales (ETag / Last-Modified / 304) para los GET publicos
+#
+# El ETag se deriva de la version de las tablas de las que depende cada
+# ruta, por lo que un 304 se responde sin ejecutar el handler ni consultar
+# los datos. La excepcion es "If-None-Match: *", que solo aplica si el recurso
+# existe: ahi se ejecuta el handler y el 304 se da solo si responde 200.
+
+# Prefijo de ruta -> tablas de las que dependen sus respuestas
+_DEPENDENCIES = {
+    "/products": ("products", "categories", "suppliers"),
+    "/categories": ("categories",),
+    "/suppliers": ("suppliers",),
+}
+
+
+def _tables_for(path: str) -> Optional[Tuple[str, ...]]:
+    for prefix, tables in _DEPENDENCIES.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return tables
+    return None
+
+
+def _etag(tables: Tuple[str, ...], version: Tuple[int, ...]) -> str:
+    raw = ",".join(f"{t}:{v}" for t, v in zip(tables, version))
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def _candidates(header: str) -> list:
+    return [c.strip() for c in header.split(",")]
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = _candidates(header)
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _not_modified_since(header: str, last_modified: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # Las fechas HTTP tienen resolucion de segundos
+    return int(last_modified) <= since
+
+
+async def conditional_get(request: Request, call_next):
+    tables = _tables_for(request.url.path) if request.method in ("GET", "HEAD") else None
+    if tables is None:
+        return await call_next(request)
+
+    version, last_modified = await run_in_threadpool(catalog.versions, tables)
+    headers = {
+        "ETag": _etag(tables, version),
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    wildcard = if_none_match is not None and "*" in _candidates(if_none_match)
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        not_modified = (
+            if_modified_since is not None
+            and last_modified is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        )
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        if wildcard:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return response
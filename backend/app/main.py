@@ -1,27 +1,61 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 # Configuracion base y rutas API
 from app.core.config import settings
-from app.api.routes.products import router as products_router
+from app.api.routes.products import facets_router as product_facets_router, router as products_router
+from app.api.routes.products_bulk import router as products_bulk_router
 from app.api.routes.categories import router as categories_router
 from app.api.routes.suppliers import router as suppliers_router
+from app.api.routes.events import router as events_router
 
 # Autenticacion
 from app.auth.auth import router as auth_router
 from app.auth.register import router as register_router
 
 # Base de datos
-from app.db import init_db, seed_data
+from app.manage import prepare_database
+from app.core.cache import caches
+from app.snapshot import snapshot
+from app.changes import broker
+from app.http_cache import conditional_get
+from app.compression import CompressionMiddleware
+from app.core.responses import FastJSONResponse
+from app.metrics import MetricsMiddleware, registry
 
 # ---------------------------------------------------------------
 
-app = FastAPI(title="Digital Price List API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Esquema, semillas y admin al arrancar (no al importar), con lock entre procesos
+    if settings.DB_AUTO_INIT:
+        await run_in_threadpool(prepare_database)
+    yield
+
+
+app = FastAPI(
+    title="Digital Price List API",
+    default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse,
+    lifespan=lifespan,
+)
 
+# ---------------------------------------------------------------
+# ETag / Last-Modified / 304 para los GET publicos del catalogo
+app.middleware("http")(conditional_get)
 
-# Crear tablas (incluye UserDB)
-init_db()
-seed_data()
+# ---------------------------------------------------------------
+# Compresion br/gzip segun Accept-Encoding (listados y exportacion)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
 
 # ---------------------------------------------------------------
 # Configurar CORS para que el frontend (React) pueda acceder
@@ -31,17 +65,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count"],  # NECESARIO para leer el total desde el frontend
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing"],  # NECESARIO para leer el total y el cursor desde el frontend
 )
 
+# ---------------------------------------------------------------
+# Metricas por ruta y Server-Timing (el mas externo: mide todo lo demas)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.METRICS_SERVER_TIMING)
+
 
 # ---------------------------------------------------------------
 # Incluir rutas
 app.include_router(auth_router)       # /login
 app.include_router(register_router)   # /register
+app.include_router(products_bulk_router)  # /products/bulk (antes de /products/{id})
+app.include_router(product_facets_router)  # /products/facets (antes de /products/{id})
+if settings.ASYNC_DB:
+    # Versiones async del CRUD; tienen prioridad sobre las sincronas
+    from app.api.routes.async_catalog import (
+        products_router as async_products_router,
+        categories_router as async_categories_router,
+        suppliers_router as async_suppliers_router,
+    )
+    app.include_router(async_products_router)
+    app.include_router(async_categories_router)
+    app.include_router(async_suppliers_router)
 app.include_router(products_router)   # /products
 app.include_router(categories_router) # /categories
 app.include_router(suppliers_router)  # /suppliers
+app.include_router(events_router)     # /catalog/events (SSE)
 
 # ---------------------------------------------------------------
 # Endpoint raiz
@@ -49,3 +101,17 @@ app.include_router(suppliers_router)  # /suppliers
 async def root():
     return {"message": "Digital Price List API funcionando correctamente"}
 
+
+# Contadores de los caches en memoria (para verificar aciertos/fallos)
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    stats["catalog_snapshot"] = snapshot.stats()
+    stats["change_stream"] = broker.stats()
+    return stats
+
+
+# Metricas en formato de texto de Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.db import DATABASE_URL, init_db, seed_data
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+# ---------------------------------------------------------------
+# Preparacion de la base (esquema, migraciones, semillas y admin)
+#
+# Ya no se ejecuta al importar app.main: lo hace el lifespan de la app al
+# arrancar (DB_AUTO_INIT=true) o un comando unico antes de levantar los
+# workers. En ambos casos se toma un lock de archivo entre procesos, asi varios
+# workers que arrancan a la vez no compiten por crear tablas ni semillas.
+#
+# Uso: python -m app.manage [init-db|seed|create-admin|setup]
+
+
+def _lock_path() -> str:
+    if settings.DB_INIT_LOCK_FILE:
+        return settings.DB_INIT_LOCK_FILE
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return os.path.abspath(url.database) + ".init.lock"
+    # Motores de servidor: el lock solo coordina los workers de esta maquina
+    return os.path.join(tempfile.gettempdir(), "digital-price-list.init.lock")
+
+
+@contextmanager
+def database_lock(timeout: float = 60.0):
+    """Lock exclusivo entre procesos para tareas de inicializacion."""
+    with open(_lock_path(), "a+b") as handle:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No se obtuvo el lock de inicializacion ({_lock_path()})")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _bootstrap_admin():
+    # Importado aqui: app.auth carga passlib/bcrypt, innecesario para init-db
+    from app.auth.dependencies import bootstrap_admin
+    bootstrap_admin()
+
+
+def prepare_database():
+    """Esquema + migraciones, semillas y admin inicial, bajo el lock."""
+    with database_lock():
+        init_db()
+        seed_data()
+        _bootstrap_admin()
+
+
+COMMANDS = {
+    "init-db": init_db,
+    "seed": seed_data,
+    "create-admin": _bootstrap_admin,
+    "setup": prepare_database,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "setup":
+        prepare_database()
+    else:
+        with database_lock():
+            COMMANDS[args.command]()
+    print(f"{args.command}: ok ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# ---------------------------------------------------------------
+# Metricas por ruta: latencia, sentencias SQL, tiempo en SQL y filas leidas
+#
+# MetricsMiddleware abre un RequestStats por peticion en un ContextVar; los
+# eventos de SQLAlchemy (y el cursor de SQLite que cuenta filas) suman sobre
+# el de la peticion actual. Los handlers sincronos corren en el threadpool con
+# una copia del contexto, asi que tambien quedan atribuidos. Al terminar se
+# acumula en el registro por (metodo, ruta) que expone GET /metrics en formato
+# de texto de Prometheus; cada respuesta lleva ademas un header Server-Timing.
+#
+# Filas leidas: con SQLite se cuentan en el cursor (fetchone/fetchmany/fetchall);
+# en otros drivers se usa cursor.rowcount cuando el driver lo informa.
+
+logger = logging.getLogger("app.sql")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestStats:
+    scope: Optional[dict] = None
+    statements: int = 0
+    sql_seconds: float = 0.0
+    rows: int = 0
+
+    @property
+    def route(self) -> str:
+        # Plantilla de la ruta (/products/{product_id}), no la URL: cardinalidad acotada.
+        # El router la deja en el scope al resolver la peticion.
+        route = self.scope.get("route") if self.scope else None
+        return getattr(route, "path", "unmatched")
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class _RouteMetrics:
+    __slots__ = ("buckets", "count", "latency_sum", "statements", "sql_seconds", "rows", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # el ultimo es +Inf
+        self.count = 0
+        self.latency_sum = 0.0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.statuses: Dict[int, int] = {}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self.slow_queries = 0
+
+    def observe(self, method: str, stats: RequestStats, status: int, seconds: float) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, stats.route))
+            if metrics is None:
+                metrics = self._routes[(method, stats.route)] = _RouteMetrics()
+            metrics.buckets[bisect_left(BUCKETS, seconds)] += 1
+            metrics.count += 1
+            metrics.latency_sum += seconds
+            metrics.statements += stats.statements
+            metrics.sql_seconds += stats.sql_seconds
+            metrics.rows += stats.rows
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def render(self) -> str:
+        """Formato de texto de Prometheus (version 0.0.4)."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Latencia de las peticiones por ruta.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), m in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, value in zip(BUCKETS + (float("inf"),), m.buckets):
+                    cumulative += value
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+
+            counters = [
+                ("http_requests_total", "Peticiones por ruta y codigo de estado.", None),
+                ("db_statements_total", "Sentencias SQL ejecutadas por ruta.", "statements"),
+                ("db_query_seconds_total", "Tiempo total en SQL por ruta.", "sql_seconds"),
+                ("db_rows_fetched_total", "Filas leidas de la base por ruta.", "rows"),
+            ]
+            for name, help_text, attr in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), m in routes:
+                    labels = f'method="{method}",route="{_escape(route)}"'
+                    if attr is None:
+                        for status, value in sorted(m.statuses.items()):
+                            lines.append(f'{name}{{{labels},status="{status}"}} {value}')
+                    else:
+                        value = getattr(m, attr)
+                        lines.append(f"{name}{{{labels}}} {value:.6f}" if isinstance(value, float) else f"{name}{{{labels}}} {value}")
+
+            lines += [
+                "# HELP db_slow_queries_total Sentencias que superaron METRICS_SLOW_QUERY_MS.",
+                "# TYPE db_slow_queries_total counter",
+                f"db_slow_queries_total {self.slow_queries}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+# --- Hooks de SQLAlchemy (todos los engines, incluido el sync_engine async) ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+        if not isinstance(cursor, CountingCursor) and cursor.rowcount and cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+    if elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+        registry.slow_queries += 1
+        # Sin parametros: pueden contener datos sensibles
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s: %s",
+            elapsed * 1000,
+            stats.route if stats else "-",
+            " ".join(statement.split())[:500],
+        )
+
+
+if settings.METRICS_ENABLED:
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Cursor de SQLite que cuenta las filas leidas ---
+
+def _count_rows(count: int) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += count
+
+
+class CountingCursor(sqlite3.Cursor):
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _count_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        _count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _count_rows(len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=None):
+        return super().cursor(factory or CountingCursor)
+
+
+# --- Middleware ASGI ---
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, server_timing: bool = True) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append(
+                        "Server-Timing",
+                        f'app;dur={elapsed_ms:.1f}, db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} consultas, {stats.rows} filas"',
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            registry.observe(scope["method"], stats, status, time.perf_counter() - start)
+
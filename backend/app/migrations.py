@@ -0,0 +1,129 @@
+import sys
+import time
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+from app.core.text import normalize_name
+from app.db import Base, engine
+
+# ---------------------------------------------------------------
+# Migraciones versionadas del esquema
+#
+# create_all solo crea tablas nuevas; los cambios sobre tablas existentes
+# (columnas, indices) se aplican aqui. Cada migracion corre una sola vez, en
+# su propia transaccion junto con el registro en schema_migrations, y se
+# escribe de forma idempotente para que una base creada desde cero con
+# create_all (que ya tiene todo) solo quede marcada como actualizada.
+#
+# Uso: python -m app.migrations [upgrade|status]
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", Float, nullable=False),
+)
+
+
+def _columns(conn, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _create_indexes(conn, *names: str) -> None:
+    """Crea indices declarados en los modelos, buscados por nombre."""
+    indexes = {i.name: i for t in Base.metadata.sorted_tables for i in t.indexes}
+    for name in names:
+        conn.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+
+def _products_name_key(conn):
+    if "name_key" not in _columns(conn, "products"):
+        conn.execute(text("ALTER TABLE products ADD COLUMN name_key VARCHAR"))
+    # Backfill de la clave normalizada para filas sin calcular
+    pending = conn.execute(text("SELECT id, name FROM products WHERE name_key IS NULL")).all()
+    if pending:
+        conn.execute(
+            text("UPDATE products SET name_key = :key WHERE id = :id"),
+            [{"id": pid, "key": normalize_name(pname)} for pid, pname in pending],
+        )
+    _create_indexes(conn, "ix_products_name_key")
+
+
+def _users_token_version(conn):
+    if "token_version" not in _columns(conn, "users"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _pagination_indexes(conn):
+    _create_indexes(conn, "ix_categories_lower_name", "ix_products_price_id", "ix_products_categoria_id_id")
+
+
+def _search_index(conn):
+    # Importado aqui para evitar ciclo con app.search
+    from app.search import ensure_search_index
+    ensure_search_index(conn)
+
+
+def _fk_and_sort_indexes(conn):
+    _create_indexes(conn, "ix_products_supplier_id", "ix_products_lower_name", "ix_products_categoria_id_name")
+
+
+def _facet_filter_indexes(conn):
+    _create_indexes(conn, "ix_products_categoria_id_price", "ix_products_supplier_id_price")
+
+
+# (version, nombre, funcion) en orden; nunca reordenar ni renumerar
+MIGRATIONS = [
+    (1, "products_name_key", _products_name_key),
+    (2, "users_token_version", _users_token_version),
+    (3, "pagination_indexes", _pagination_indexes),
+    (4, "products_search_fts", _search_index),
+    (5, "fk_and_sort_indexes", _fk_and_sort_indexes),
+    (6, "facet_filter_indexes", _facet_filter_indexes),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+
+def applied_versions(bind=None) -> set:
+    bind = bind or engine
+    _meta.create_all(bind=bind)
+    with bind.connect() as conn:
+        return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+def upgrade(bind=None) -> list:
+    """Aplica las migraciones pendientes; devuelve los nombres aplicados."""
+    bind = bind or engine
+    done = applied_versions(bind)
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with bind.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=time.time()))
+        applied.append(name)
+    return applied
+
+
+def main(argv=None):
+    command = (argv or sys.argv[1:] or ["upgrade"])[0]
+    Base.metadata.create_all(bind=engine)
+    if command == "upgrade":
+        applied = upgrade()
+        print("\n".join(applied) if applied else "Sin migraciones pendientes")
+    elif command == "status":
+        done = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>3} {name:<24} {'aplicada' if version in done else 'pendiente'}")
+    else:
+        print("Uso: python -m app.migrations [upgrade|status]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from typing import List, Optional
+
+from app.models.category import Category
+from app.models.supplier import Supplier
 
 
 class ProductBase(BaseModel):
@@ -26,3 +29,68 @@ class Product(ProductBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductExpanded(Product):
+    """Producto con sus relaciones embebidas (solo las pedidas en `expand`)."""
+    category: Optional[Category] = None
+    supplier: Optional[Supplier] = None
+
+
+class ProductBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500, description="Ids a consultar (maximo 500)")
+
+
+class ProductBatch(BaseModel):
+    items: List[ProductExpanded] = Field(..., description="Productos en el orden pedido")
+    missing: List[int] = Field(..., description="Ids que no existen")
+
+
+class FacetCount(BaseModel):
+    id: int
+    name: Optional[str] = None
+    count: int
+
+
+class PriceStats(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    avg: Optional[float] = None
+
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[FacetCount]
+    suppliers: List[FacetCount]
+    price: PriceStats
+
+
+class PriceChange(BaseModel):
+    id: int
+    price: float = Field(..., ge=0)
+
+
+class RepriceRule(BaseModel):
+    percent: Optional[float] = Field(None, ge=-100, description="Variacion porcentual, p. ej. 7 = +7%")
+    round_to: Optional[float] = Field(None, gt=0, description="Redondear al multiplo mas cercano, p. ej. 50")
+    supplier_id: Optional[int] = None
+    categoria_id: Optional[int] = None
+    all: bool = Field(False, description="Aplicar a todo el catalogo; obligatorio si no hay supplier_id ni categoria_id")
+
+    @model_validator(mode="after")
+    def check_operation(self):
+        if self.percent is None and self.round_to is None:
+            raise ValueError("La regla necesita percent o round_to")
+        if self.supplier_id is None and self.categoria_id is None and not self.all:
+            raise ValueError("La regla necesita supplier_id, categoria_id o all=true")
+        return self
+
+
+class RepriceRequest(BaseModel):
+    items: Optional[List[PriceChange]] = Field(None, max_length=10000)
+    rule: Optional[RepriceRule] = None
+    dry_run: bool = False
+
+    @model_validator(mode="after")
+    def check_mode(self):
+        if (self.items is None) == (self.rule is None):
+            raise ValueError("Enviar items o rule (solo uno)")
+        return self
@@ -0,0 +1,123 @@
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.text import normalize_name
+from app.db import engine, ProductDB
+
+# ---------------------------------------------------------------
+# Busqueda de productos con SQLite FTS5 (tokenizador trigram)
+#
+# El indice se construye sobre name_key, que ya aplica las reglas de
+# _normalize_name (minusculas, sin tildes ni signos). Asi "jamon" encuentra
+# "Jamón" y la busqueda se comporta como un LIKE '%q%' pero usando indice.
+
+FTS_TABLE = "products_fts"
+_TRIGRAM_MIN = 3
+
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name_key, content='products', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name_key) VALUES (new.id, new.name_key);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name_key ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+        INSERT INTO {FTS_TABLE}(rowid, name_key) VALUES (new.id, new.name_key);
+    END""",
+]
+
+_fts_enabled = None
+
+
+def ensure_search_index(conn) -> bool:
+    """Crea la tabla FTS y sus triggers; reconstruye el indice si es nuevo."""
+    global _fts_enabled
+    if conn.dialect.name != "sqlite":
+        _fts_enabled = False
+        return False
+
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": FTS_TABLE}
+    ).first()
+    try:
+        for ddl in _FTS_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError:
+        # SQLite sin FTS5 o sin trigram (< 3.34): se usa LIKE sobre name_key
+        _fts_enabled = False
+        return False
+
+    _fts_enabled = True
+    return True
+
+
+def _fts_available() -> bool:
+    global _fts_enabled
+    if _fts_enabled is None:
+        if engine.dialect.name != "sqlite":
+            _fts_enabled = False
+        else:
+            with engine.connect() as conn:
+                _fts_enabled = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": FTS_TABLE}
+                ).first() is not None
+    return _fts_enabled
+
+
+def product_search_filter(q: str):
+    """Condicion de filtro para buscar productos por nombre."""
+    key = normalize_name(q)
+    if not key:
+        # Solo signos: se conserva la busqueda literal original
+        return ProductDB.name.ilike(f"%{q}%")
+
+    if len(key) >= _TRIGRAM_MIN and _fts_available():
+        return text(
+            f"products.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_q)"
+        ).bindparams(fts_q=f'"{key}"')
+
+    # Consultas cortas (trigram necesita 3 caracteres) o motores sin FTS5
+    return ProductDB.name_key.like(f"%{key}%")
+
+
+class ProductFilters(NamedTuple):
+    """Filtros por faceta del listado (categoria, proveedor y rango de precio)."""
+
+    categoria_id: Optional[int] = None
+    supplier_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return any(value is not None for value in self)
+
+    def clauses(self) -> list:
+        """Condiciones SQL (respaldadas por los indices (categoria_id|supplier_id, price, id))."""
+        clauses = []
+        if self.categoria_id is not None:
+            clauses.append(ProductDB.categoria_id == self.categoria_id)
+        if self.supplier_id is not None:
+            clauses.append(ProductDB.supplier_id == self.supplier_id)
+        if self.min_price is not None:
+            clauses.append(ProductDB.price >= self.min_price)
+        if self.max_price is not None:
+            clauses.append(ProductDB.price <= self.max_price)
+        return clauses
+
+    def matches(self, row) -> bool:
+        """Mismo criterio que clauses() sobre una fila en memoria (snapshot)."""
+        return (
+            (self.categoria_id is None or row.categoria_id == self.categoria_id)
+            and (self.supplier_id is None or row.supplier_id == self.supplier_id)
+            and (self.min_price is None or row.price >= self.min_price)
+            and (self.max_price is None or row.price <= self.max_price)
+        )
@@ -0,0 +1,284 @@
+import string
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from app import catalog
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.text import normalize_name
+from app.db import SessionLocal, CategoryDB, ProductDB, SupplierDB
+from app.models.product import Product
+from app.search import ProductFilters
+
+# ---------------------------------------------------------------
+# Snapshot desnormalizado del catalogo publico
+#
+# Una copia en memoria de los productos con los nombres de categoria y
+# proveedor, el JSON de cada producto ya serializado y el orden precalculado
+# para sort=name|price|categoria. Lo sirve GET /products mientras su version
+# coincida con catalog.versions(); si esta desactualizado se reconstruye en
+# segundo plano y, mientras tanto, las peticiones usan la consulta en vivo.
+#
+# La reconstruccion es incremental: reutiliza el JSON de las filas sin cambios
+# y parchea cada orden moviendo solo las filas cuya clave cambio (cambiar un
+# precio no toca el orden por nombre; renombrar una categoria solo reubica sus
+# productos en el orden por categoria).
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _sql_lower(value: str) -> str:
+    # lower() de SQLite solo convierte ASCII; el orden debe coincidir con la consulta
+    return value.translate(_ASCII_LOWER)
+
+
+class Row(NamedTuple):
+    id: int
+    name: str
+    name_key: str
+    price: float
+    categoria_id: int
+    supplier_id: int
+    categoria: Optional[str]
+    supplier: Optional[str]
+    body: bytes
+
+
+class Page(NamedTuple):
+    body: bytes
+    total: int
+    next_position: Optional[Tuple[object, int]]  # (valor de orden, id) del ultimo item
+    rows: List[Row]  # filas de la pagina (para expand)
+
+
+def _sort_value(row: Row, sort: str):
+    if sort == "categoria":
+        return _sql_lower(row.categoria)
+    return getattr(row, sort)
+
+
+class Snapshot:
+    SORTS = ("name", "price", "categoria")
+
+    def __init__(
+        self,
+        version: tuple,
+        rows: Dict[int, Row],
+        orders: Dict[str, List[Row]],
+        keys: Optional[Dict[str, list]] = None,
+    ):
+        self.version = version
+        self.rows = rows
+        self.orders = orders  # ascendente por (valor, id)
+        self.built_at = time.time()
+        keys = keys or {}
+        self._keys = {
+            sort: keys[sort] if sort in keys else [(_sort_value(r, sort), r.id) for r in rows_]
+            for sort, rows_ in orders.items()
+        }
+        # Busqueda/filtros -> posiciones en orders[sort] (array de enteros, no filas)
+        self._searches = TTLCache(
+            maxsize=settings.CATALOG_SNAPSHOT_SEARCH_CACHE_SIZE,
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+            maxweight=settings.CATALOG_SNAPSHOT_SEARCH_CACHE_ROWS,
+        )
+
+    def _positions(self, key: Optional[str], sort: str, filters: Optional[ProductFilters] = None):
+        """Posiciones (crecientes) de las filas que coinciden; None si no hay busqueda ni filtros."""
+        if filters is not None and not filters.active:
+            filters = None
+        if not key and filters is None:
+            return None
+
+        def load():
+            return array("i", (
+                i for i, r in enumerate(self.orders[sort])
+                if (not key or key in r.name_key) and (filters is None or filters.matches(r))
+            ))
+
+        return self._searches.get_or_set((key, sort, filters), load)
+
+    def page(
+        self,
+        q: Optional[str],
+        sort: str,
+        order: str,
+        offset: int,
+        limit: int,
+        cursor_mode: bool = False,
+        position: Optional[Tuple[object, int]] = None,
+        filters: Optional[ProductFilters] = None,
+    ) -> Optional[Page]:
+        """Pagina con la misma semantica que la consulta en vivo; None si no aplica."""
+        key = normalize_name(q) if q else None
+        if q and not key:
+            return None  # busqueda literal de solo signos (ILIKE): consulta en vivo
+
+        ordered, keys = self.orders[sort], self._keys[sort]
+        positions = self._positions(key, sort, filters)
+        n = len(ordered) if positions is None else len(positions)
+        asc = order == "asc"
+        take = limit + 1 if cursor_mode else limit
+
+        def before(index: int) -> int:
+            # Cantidad de filas coincidentes antes de la posicion `index` del orden completo
+            return index if positions is None else bisect_left(positions, index)
+
+        if position is None:
+            start = offset if not cursor_mode else 0
+        else:
+            try:
+                start = before(bisect_right(keys, position)) if asc else n - before(bisect_left(keys, position))
+            except TypeError:
+                return None  # cursor con un tipo de valor inesperado
+        if asc:
+            window = range(start, min(start + take, n))
+        else:
+            end = n - start
+            window = range(max(end, 0) - 1, max(end - take, 0) - 1, -1)
+        selected = [ordered[i if positions is None else positions[i]] for i in window]
+
+        next_position = None
+        if cursor_mode and len(selected) > limit:
+            last = selected[limit - 1]
+            next_position = (_sort_value(last, sort), last.id)
+            selected = selected[:limit]
+        return Page(b"[" + b",".join(r.body for r in selected) + b"]", n, next_position, selected)
+
+
+def _serialize(values: tuple) -> bytes:
+    id_, name, _, price, categoria_id, supplier_id = values
+    product = Product.model_validate(
+        {"id": id_, "name": name, "price": price, "categoria_id": categoria_id, "supplier_id": supplier_id}
+    )
+    return product.model_dump_json().encode()
+
+
+def _in_order(row: Row, sort: str) -> bool:
+    # Sin categoria no aparece en el orden por categoria (como el JOIN en vivo)
+    return sort != "categoria" or row.categoria is not None
+
+
+def _moved(previous: Snapshot, sort: str, rows: Dict[int, Row], changed: set) -> set:
+    """Ids que entran, salen o cambian de lugar en el orden de `sort`."""
+    old = previous.rows
+    return {
+        id_ for id_ in changed
+        if id_ not in rows
+        or id_ not in old
+        or _in_order(old[id_], sort) != _in_order(rows[id_], sort)
+        or (_in_order(rows[id_], sort) and _sort_value(old[id_], sort) != _sort_value(rows[id_], sort))
+    }
+
+
+def _patch_order(previous: List[Row], sort: str, rows: Dict[int, Row], moved: set) -> List[Row]:
+    """
+    Orden de `sort` a partir del anterior: las filas que no se movieron
+    conservan su lugar y solo se ordenan e intercalan las que cambiaron.
+    """
+    kept = [rows[r.id] for r in previous if r.id not in moved]
+
+    def key(row: Row):
+        return _sort_value(row, sort), row.id
+
+    added = sorted((rows[id_] for id_ in moved if id_ in rows and _in_order(rows[id_], sort)), key=key)
+    return list(merge(kept, added, key=key)) if added else kept
+
+
+def build(previous: Optional[Snapshot] = None) -> Snapshot:
+    """Construye el snapshot reutilizando lo que no cambio respecto a `previous`."""
+    version, _ = catalog.versions()
+    with SessionLocal() as db:
+        categories = dict(db.execute(select(CategoryDB.id, CategoryDB.name)).all())
+        suppliers = dict(db.execute(select(SupplierDB.id, SupplierDB.name)).all())
+        products = db.execute(
+            select(
+                ProductDB.id,
+                ProductDB.name,
+                ProductDB.name_key,
+                ProductDB.price,
+                ProductDB.categoria_id,
+                ProductDB.supplier_id,
+            )
+        ).all()
+
+    old = previous.rows if previous else {}
+    rows: Dict[int, Row] = {}
+    changed = set()  # ids nuevos, borrados o con algun campo de orden distinto
+    for values in products:
+        values = tuple(values)
+        prev = old.get(values[0])
+        same = prev is not None and tuple(prev[:6]) == values
+        body = prev.body if same else _serialize(values)
+        row = Row(*values, categories.get(values[4]), suppliers.get(values[5]), body)
+        if not same or prev.categoria != row.categoria:
+            changed.add(row.id)
+        rows[row.id] = row
+    changed.update(old.keys() - rows.keys())
+
+    orders: Dict[str, List[Row]] = {}
+    keys: Dict[str, list] = {}
+    for sort in Snapshot.SORTS:
+        if previous is None:
+            candidates = [r for r in rows.values() if _in_order(r, sort)]
+            orders[sort] = sorted(candidates, key=lambda r: (_sort_value(r, sort), r.id))
+            continue
+        moved = _moved(previous, sort, rows, changed)
+        orders[sort] = _patch_order(previous.orders[sort], sort, rows, moved)
+        if not moved:
+            keys[sort] = previous._keys[sort]  # mismas claves y lugares: no se recalculan
+    return Snapshot(version, rows, orders, keys)
+
+
+class _Holder:
+    """Snapshot vigente, reconstruccion en segundo plano y contadores."""
+
+    def __init__(self):
+        self.snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+        self.rebuilds = 0
+
+    def refresh(self) -> Snapshot:
+        with self._lock:
+            current = self.snapshot
+            if current is None or current.version != catalog.versions()[0]:
+                current = self.snapshot = build(current)
+                self.rebuilds += 1
+            return current
+
+    def _refresh_in_background(self):
+        if self._lock.locked():
+            return
+        threading.Thread(target=self.refresh, name="catalog-snapshot", daemon=True).start()
+
+    def current(self) -> Optional[Snapshot]:
+        """Snapshot vigente o None (y dispara la reconstruccion) si esta desactualizado."""
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version == catalog.versions()[0]:
+            self.hits += 1
+            return snapshot
+        self.fallbacks += 1
+        self._refresh_in_background()
+        return None
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "rebuilds": self.rebuilds,
+            "rows": len(snapshot.rows) if snapshot else 0,
+            "version": list(snapshot.version) if snapshot else None,
+            "built_at": snapshot.built_at if snapshot else None,
+        }
+
+
+snapshot = _Holder()
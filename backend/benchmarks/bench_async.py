@@ -0,0 +1,69 @@
+"""
+Compara el throughput concurrente del camino sincrono (threadpool) contra
+los handlers async (ASYNC_DB=true) sobre la misma base SQLite.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_async [--requests 2000] [--concurrency 12]
+
+El camino sincrono queda limitado por el threadpool (40 hilos) y por el pool
+de DB_POOL_SIZE + DB_MAX_OVERFLOW conexiones (20 + 30 por defecto): con una
+concurrencia mayor al menor de los dos las peticiones esperan hilo o conexion
+(y pasado DB_POOL_TIMEOUT fallan); el async no ocupa hilos.
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import remove_database, run_isolated, run_load, temp_database_url
+
+PRODUCTS = 2000
+
+
+def _child(total: int, concurrency: int) -> dict:
+    from app.main import app
+    from app.db import SessionLocal, ProductDB
+    from app.manage import prepare_database
+
+    prepare_database()  # tablas y semillas antes de cargar productos
+    db = SessionLocal()
+    if db.query(ProductDB).count() == 0:
+        db.add_all(
+            ProductDB(name=f"Producto {i}", price=1000 + i, categoria_id=1 + i % 4, supplier_id=1 + i % 3)
+            for i in range(PRODUCTS)
+        )
+        db.commit()
+    db.close()
+
+    def make_request(i: int):
+        return "GET", f"/products/{1 + (i * 7919) % PRODUCTS}", {}
+
+    return asyncio.run(run_load(app, make_request, total, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.requests, args.concurrency)))
+        return
+
+    url = temp_database_url()
+    results = {}
+    try:
+        for mode in ("sync", "async"):
+            env = {"DATABASE_URL": url, "ASYNC_DB": "true" if mode == "async" else "false"}
+            results[mode] = run_isolated(
+                "benchmarks.bench_async", env, "--child",
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+            )
+    finally:
+        remove_database(url)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Carga mixta lectura/escritura con el perfil de engine por defecto frente al
+perfil "tuned" (WAL, synchronous=NORMAL, mmap, cache, busy_timeout y pool
+explicito). Cada perfil usa su propia base temporal.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_db_profile [--requests 3000] [--concurrency 12] [--write-ratio 0.1]
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import remove_database, run_isolated, run_load, temp_database_url
+
+PRODUCTS = 2000
+
+
+def _child(total: int, concurrency: int, write_ratio: float) -> dict:
+    from app.main import app
+    from app.core.config import settings
+    from app.db import SessionLocal, ProductDB
+    from app.auth.auth import create_access_token
+    from app.manage import prepare_database
+
+    prepare_database()  # tablas y semillas antes de cargar productos
+    db = SessionLocal()
+    db.add_all(
+        ProductDB(name=f"Producto {i}", price=1000 + i, categoria_id=1 + i % 4, supplier_id=1 + i % 3)
+        for i in range(PRODUCTS)
+    )
+    db.commit()
+    db.close()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': settings.ADMIN_USERNAME})}"}
+    every = max(1, round(1 / write_ratio)) if write_ratio > 0 else 0
+
+    def make_request(i: int):
+        product_id = 1 + (i * 7919) % PRODUCTS
+        if every and i % every == 0:
+            return "PUT", f"/products/{product_id}", {"json": {"price": 1000 + i}, "headers": headers}
+        if i % 2:
+            return "GET", f"/products/{product_id}", {}
+        return "GET", "/products", {"params": {"q": f"producto {i % 100}", "sort": "price", "limit": 20}}
+
+    return asyncio.run(run_load(app, make_request, total, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.requests, args.concurrency, args.write_ratio)))
+        return
+
+    results = {}
+    for profile in ("default", "tuned"):
+        url = temp_database_url()
+        try:
+            results[profile] = run_isolated(
+                "benchmarks.bench_db_profile", {"DATABASE_URL": url, "DB_ENGINE_PROFILE": profile}, "--child",
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                "--write-ratio", str(args.write_ratio),
+            )
+        finally:
+            remove_database(url)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Carga concurrente sobre un catalogo sintetico con escenarios de uso reales:
+navegar la lista (ordenes y paginas variadas), buscar, ver un producto y una
+mezcla con escrituras del admin. Reporta p50/p95/p99 y rps por escenario y
+nivel de concurrencia, en JSON con el commit para comparar entre versiones.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_load [--products 10000] [--requests 2000]
+        [--concurrency 1,8,32] [--scenarios browse,search,detail,mixed] [--output load.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from benchmarks.common import remove_database, run_isolated, run_load, run_metadata, temp_database_url
+
+TERMS = ["jam", "queso", "chorizo", "salchich", "arepa", "cafe", "lacteos", "ahumado", "añejo", "pastuso", "zzzz"]
+SCENARIOS = ("browse", "search", "detail", "mixed")
+
+
+def _requests(scenario: str, products: int, headers: dict, seed: int):
+    rng = random.Random(seed)
+
+    def browse(i: int):
+        params = {
+            "sort": rng.choice(("name", "price", "categoria")),
+            "order": rng.choice(("asc", "desc")),
+            "limit": rng.choice((6, 24, 100)),
+            "offset": rng.randrange(0, max(products - 100, 1)),
+        }
+        return "GET", "/products", {"params": params}
+
+    def search(i: int):
+        return "GET", "/products", {"params": {"q": rng.choice(TERMS), "limit": 24}}
+
+    def detail(i: int):
+        return "GET", f"/products/{rng.randrange(1, products + 1)}", {}
+
+    def write(i: int):
+        return "PUT", f"/products/{rng.randrange(1, products + 1)}", {
+            "json": {"price": rng.randrange(500, 90000, 50)}, "headers": headers,
+        }
+
+    if scenario == "mixed":
+        # 60% lista, 25% busqueda, 10% detalle, 5% escrituras
+        weighted = [(browse, 60), (search, 25), (detail, 10), (write, 5)]
+        kinds = [kind for kind, weight in weighted for _ in range(weight)]
+        return lambda i: rng.choice(kinds)(i)
+    return {"browse": browse, "search": search, "detail": detail}[scenario]
+
+
+def _child(products: int, total: int, levels: list, scenarios: list, seed: int) -> dict:
+    from benchmarks.catalog import prepare
+
+    generated = prepare(products, seed=seed)
+
+    from app.auth.auth import create_access_token
+    from app.core.config import settings
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': settings.ADMIN_USERNAME})}"}
+    results = {"catalog": generated}
+    for scenario in scenarios:
+        for concurrency in levels:
+            make_request = _requests(scenario, products, headers, seed)
+            results[f"{scenario}/c={concurrency}"] = asyncio.run(run_load(app, make_request, total, concurrency))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por escenario y nivel")
+    parser.add_argument("--concurrency", default="1,8,32", help="Niveles de concurrencia separados por coma")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON de resultados (para benchmarks.compare)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    scenarios = [s.strip() for s in args.scenarios.split(",")]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    if args.child:
+        print(json.dumps(_child(args.products, args.requests, levels, scenarios, args.seed)))
+        return
+
+    url = temp_database_url()
+    try:
+        results = run_isolated(
+            "benchmarks.bench_load", {"DATABASE_URL": url}, "--child",
+            "--products", str(args.products), "--requests", str(args.requests),
+            "--concurrency", args.concurrency, "--scenarios", ",".join(scenarios), "--seed", str(args.seed),
+        )
+    finally:
+        remove_database(url)
+    meta = {**run_metadata(), "benchmark": "load", "products": args.products, "requests": args.requests}
+    text = json.dumps({"meta": meta, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Throughput de POST /login con el admin creado al arrancar (sin bcrypt extra
+por peticion). Compara distintos tamanos del pool de hashing.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_login [--requests 200] [--concurrency 16] [--workers 1,4]
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import remove_database, run_isolated, run_load, temp_database_url
+
+
+def _child(total: int, concurrency: int) -> dict:
+    from app.main import app
+    from app.core.config import settings
+
+    def make_request(i: int):
+        # IPs distintas para no chocar con el rate limit de intentos fallidos
+        return "POST", "/login", {
+            "data": {"username": settings.ADMIN_USERNAME, "password": settings.ADMIN_PASSWORD},
+            "headers": {"x-forwarded-for": f"10.0.{i // 250}.{i % 250}"},
+        }
+
+    return asyncio.run(run_load(app, make_request, total, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", default="1,4", help="Tamanos de PASSWORD_HASH_WORKERS a comparar")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.requests, args.concurrency)))
+        return
+
+    url = temp_database_url()
+    results = {}
+    try:
+        for workers in args.workers.split(","):
+            env = {"DATABASE_URL": url, "PASSWORD_HASH_WORKERS": workers.strip()}
+            results[f"workers={workers.strip()}"] = run_isolated(
+                "benchmarks.bench_login", env, "--child",
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+            )
+    finally:
+        remove_database(url)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
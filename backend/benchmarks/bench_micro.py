@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks de las rutas calientes sobre un catalogo sintetico:
+normalize_name, GET /products en cada combinacion de orden/busqueda (snapshot
+y consulta en vivo), alta/edicion con verificacion de duplicados y login.
+Imprime JSON con p50/p95 por caso y los metadatos del commit.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_micro [--products 10000] [--repeat 50] [--output micro.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+from itertools import product as combinations
+from typing import Callable, Dict, List
+
+from benchmarks.common import percentile, remove_database, run_isolated, run_metadata, temp_database_url
+
+SEARCHES = {"none": None, "short": "jam", "word": "queso", "phrase": "chorizo picante", "miss": "zzzz"}
+
+
+def _timing(samples: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+    }
+
+
+def _bench_normalize(names: List[str], repeat: int) -> Dict[str, float]:
+    from app.core.text import normalize_name
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            normalize_name(name)
+        samples.append((time.perf_counter() - start) / len(names))
+    result = _timing(samples)
+    result["per_call_us"] = round(percentile(samples, 50) * 1e6, 3)
+    return result
+
+
+async def _measure(client, repeat: int, make_request: Callable[[int], tuple], expect: int) -> Dict[str, float]:
+    samples, errors = [], 0
+    for i in range(repeat):
+        method, url, kwargs = make_request(i)
+        start = time.perf_counter()
+        res = await client.request(method, url, **kwargs)
+        samples.append(time.perf_counter() - start)
+        if res.status_code != expect:
+            errors += 1
+    result = _timing(samples)
+    result["errors"] = errors
+    return result
+
+
+async def _bench_app(repeat: int, products: int) -> Dict[str, Dict]:
+    import httpx
+
+    from app.auth.auth import create_access_token
+    from app.core.config import settings
+    from app.main import app
+    from app.snapshot import snapshot
+
+    results: Dict[str, Dict] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        snapshot.refresh()
+
+        # GET /products: cada orden, sentido y busqueda, con y sin snapshot
+        listing = {}
+        for mode, sort, order, (label, q) in combinations(
+            ("snapshot", "live"), ("name", "price", "categoria"), ("asc", "desc"), SEARCHES.items()
+        ):
+            settings.CATALOG_SNAPSHOT_ENABLED = mode == "snapshot"
+            params = {"sort": sort, "order": order, "limit": 50}
+            if q:
+                params["q"] = q
+
+            def make_request(i: int, params=params):
+                # Paginas distintas para no medir siempre la primera
+                return "GET", "/products", {"params": {**params, "offset": (i * 50) % max(products // 2, 1)}}
+
+            listing[f"{mode}/{sort}/{order}/{label}"] = await _measure(client, repeat, make_request, 200)
+        settings.CATALOG_SNAPSHOT_ENABLED = True
+        results["list_products"] = listing
+
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': settings.ADMIN_USERNAME})}"}
+        base = {"price": 4500, "categoria_id": 1, "supplier_id": 1}
+
+        def create(i: int):
+            return "POST", "/products", {"json": {**base, "name": f"Pernil Ahumado Bench {i}"}, "headers": headers}
+
+        def duplicate(i: int):
+            # Mismo nombre con otra grafia: lo rechaza la clave normalizada
+            return "POST", "/products", {"json": {**base, "name": f"PERNIL  ahumado bench {i}"}, "headers": headers}
+
+        def update(i: int):
+            return "PUT", f"/products/{1 + (i * 7919) % products}", {"json": {"price": 5000 + i}, "headers": headers}
+
+        results["create_product"] = await _measure(client, repeat, create, 201)
+        results["create_duplicate"] = await _measure(client, repeat, duplicate, 409)
+        results["update_product"] = await _measure(client, repeat, update, 200)
+
+        def login(i: int):
+            # IPs distintas para no chocar con el rate limit de intentos fallidos
+            return "POST", "/login", {
+                "data": {"username": settings.ADMIN_USERNAME, "password": settings.ADMIN_PASSWORD},
+                "headers": {"x-forwarded-for": f"10.1.{i // 250}.{i % 250}"},
+            }
+
+        results["login"] = await _measure(client, max(repeat // 5, 5), login, 200)
+    return results
+
+
+def _child(products: int, repeat: int, seed: int) -> dict:
+    from benchmarks.catalog import catalog_rows, prepare
+
+    generated = prepare(products, seed=seed)
+    names = [p["name"] for p in catalog_rows(min(products, 2000), 12, 30, seed)["products"]]
+    return {
+        "catalog": generated,
+        "normalize_name": _bench_normalize(names, repeat),
+        **asyncio.run(_bench_app(repeat, products)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50, help="Repeticiones por caso")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON de resultados (para benchmarks.compare)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.products, args.repeat, args.seed)))
+        return
+
+    url = temp_database_url()
+    try:
+        # Proceso aparte: DATABASE_URL se lee al importar app
+        results = run_isolated(
+            "benchmarks.bench_micro", {"DATABASE_URL": url}, "--child",
+            "--products", str(args.products), "--repeat", str(args.repeat), "--seed", str(args.seed),
+        )
+    finally:
+        remove_database(url)
+    report = {"meta": {**run_metadata(), "benchmark": "micro", "products": args.products, "repeat": args.repeat}, "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
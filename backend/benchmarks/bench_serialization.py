@@ -0,0 +1,113 @@
+"""
+Costo de serializar una pagina de 100 productos con cada estrategia y de
+comprimirla (gzip / br). Las filas salen de una base SQLite en memoria, como
+entidades ORM (consulta anterior) o como filas de columnas (consulta actual).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serialization [--items 100] [--repeat 2000]
+"""
+import argparse
+import json
+import time
+import zlib
+from statistics import median
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.compression import brotli
+from app.core.responses import FastJSONResponse, orjson
+from app.db import Base, CategoryDB, ProductDB, SupplierDB
+from app.models.product import Product
+from app.api.routes.products import PRODUCT_COLUMNS, dump_product_rows
+
+_adapter = TypeAdapter(List[Product])
+
+
+def _load(count: int):
+    """Devuelve (entidades ORM, filas de columnas) de una base en memoria."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    names = ["Jamón Serrano", "Queso Costeño", "Salchichón Cervecero", "Chorizo Santarrosano", "Kumis"]
+    with Session(engine) as db:
+        db.add_all([CategoryDB(id=c, name=f"Categoria {c}") for c in range(1, 5)])
+        db.add_all([SupplierDB(id=s, name=f"Proveedor {s}") for s in range(1, 4)])
+        db.add_all(
+            ProductDB(
+                name=f"{names[i % len(names)]} {i}",
+                price=1000.0 + (i * 37) % 9000,
+                categoria_id=1 + i % 4,
+                supplier_id=1 + i % 3,
+            )
+            for i in range(count)
+        )
+        db.commit()
+        entities = db.query(ProductDB).order_by(ProductDB.id).all()
+        rows = db.query(*PRODUCT_COLUMNS).order_by(ProductDB.id).all()
+        db.expunge_all()
+    return entities, rows
+
+
+def _time_us(fn: Callable[[], bytes], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(median(samples) * 1e6, 1)
+
+
+def run(items: int, repeat: int) -> dict:
+    entities, rows = _load(items)
+    snapshot_bodies = [Product.model_validate(r).model_dump_json().encode() for r in rows]
+
+    def response_model_path(response_class=JSONResponse) -> bytes:
+        # Lo que hacia list_products: modelo por entidad, response_model y json.dumps
+        models = [Product.model_validate(p) for p in entities]
+        content = _adapter.dump_python(_adapter.validate_python(models), mode="json")
+        return response_class(content).body
+
+    strategies = {
+        "per_item_model_validate + JSONResponse": response_model_path,
+        "per_item_model_validate + FastJSONResponse": lambda: response_model_path(FastJSONResponse),
+        "TypeAdapter.dump_json sobre entidades ORM": lambda: _adapter.dump_json(
+            _adapter.validate_python(entities, from_attributes=True)
+        ),
+        "dump_product_rows (filas de columnas, lo que usa list_products)": lambda: dump_product_rows(rows),
+        "snapshot (JSON por fila ya serializado)": lambda: b"[" + b",".join(snapshot_bodies) + b"]",
+    }
+    results = {
+        "items": items,
+        "fast_json_backend": "orjson" if orjson is not None else "pydantic_core",
+        "serialization_us": {name: _time_us(fn, repeat) for name, fn in strategies.items()},
+    }
+
+    body = dump_product_rows(rows)
+    compression = {"identity": {"bytes": len(body), "us": 0.0}}
+
+    def gzip6() -> bytes:
+        encoder = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return encoder.compress(body) + encoder.flush()
+
+    codecs = {"gzip-6": gzip6}
+    if brotli is not None:
+        codecs["br-4"] = lambda: brotli.compress(body, quality=4)
+    for name, fn in codecs.items():
+        compression[name] = {"bytes": len(fn()), "us": _time_us(fn, max(repeat // 4, 50))}
+    results["compression"] = compression
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
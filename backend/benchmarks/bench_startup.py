@@ -0,0 +1,99 @@
+"""
+Arranque en frio por worker: tiempo de `import app.main` y del lifespan
+(esquema, semillas y admin bajo el lock entre procesos).
+
+Escenarios, cada uno en una base temporal:
+  primero     - un worker sobre una base vacia (crea todo)
+  tibio       - workers sucesivos sobre la base ya preparada
+  simultaneos - N workers que arrancan a la vez sobre una base vacia
+  sin_init    - DB_AUTO_INIT=false tras `python -m app.manage setup`
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup [--workers 4] [--repeat 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from statistics import mean
+
+from benchmarks.common import BACKEND_DIR, remove_database, run_isolated, temp_database_url
+
+
+def _child() -> dict:
+    start = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def startup():
+        async with app.router.lifespan_context(app):
+            pass
+
+    asyncio.run(startup())
+    ready = time.perf_counter()
+    return {
+        "import_s": round(imported - start, 3),
+        "startup_s": round(ready - imported, 3),
+        "total_s": round(ready - start, 3),
+    }
+
+
+def _spawn(env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+
+def _summary(samples: list) -> dict:
+    return {
+        key: {"mean": round(mean(s[key] for s in samples), 3), "max": max(s[key] for s in samples)}
+        for key in ("import_s", "startup_s", "total_s")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child()))
+        return
+
+    results = {}
+    url = temp_database_url()
+    try:
+        env = {"DATABASE_URL": url}
+        results["primero"] = run_isolated("benchmarks.bench_startup", env, "--child")
+        results["tibio"] = _summary([run_isolated("benchmarks.bench_startup", env, "--child") for _ in range(args.repeat)])
+
+        subprocess.run([sys.executable, "-m", "app.manage", "setup"], cwd=BACKEND_DIR, env={**os.environ, **env}, check=True, capture_output=True)
+        no_init = {**env, "DB_AUTO_INIT": "false"}
+        results["sin_init"] = _summary([run_isolated("benchmarks.bench_startup", no_init, "--child") for _ in range(args.repeat)])
+    finally:
+        remove_database(url)
+
+    url = temp_database_url()
+    try:
+        procs = [_spawn({"DATABASE_URL": url}) for _ in range(args.workers)]
+        outputs = [p.communicate()[0] for p in procs]
+        failed = sum(p.returncode != 0 for p in procs)
+        samples = [json.loads(out.strip().splitlines()[-1]) for out, p in zip(outputs, procs) if p.returncode == 0]
+        results["simultaneos"] = {"workers": args.workers, "fallidos": failed, **(_summary(samples) if samples else {})}
+    finally:
+        remove_database(url)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
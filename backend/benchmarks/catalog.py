@@ -0,0 +1,136 @@
+"""
+Generador de catalogos sinteticos con nombres en espanol (tildes, enie,
+presentaciones) para los benchmarks. Es determinista para una misma semilla.
+
+Uso (desde backend/, sobre DATABASE_URL):
+    python -m benchmarks.catalog --products 10000 --categories 12 --suppliers 30 [--seed 42]
+"""
+import argparse
+import random
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+CATEGORIES = [
+    "Lácteos", "Embutidos", "Abarrotes", "Bebidas", "Carnes Frías", "Panadería", "Quesos",
+    "Enlatados", "Granos", "Dulcería", "Salsas y Aderezos", "Congelados", "Snacks", "Aseo",
+    "Licores", "Frutas y Verduras", "Café y Chocolate", "Condimentos", "Huevos", "Galletería",
+]
+_SUPPLIER_PREFIXES = ["Distribuidora", "Lácteos", "Cárnicos", "Comercializadora", "Alimentos", "Quesera", "Granja"]
+_SUPPLIER_NAMES = [
+    "Burbano", "del Valle", "San Juan", "La Montaña", "Doña Inés", "El Peñón", "Nariño", "Santa Bárbara",
+    "Los Andes", "Pasto", "Ipiales", "Tumaco", "La Cocha", "Túquerres", "El Galeras", "Sandoná",
+]
+_BASES = [
+    "Jamón", "Queso", "Salchichón", "Chorizo", "Mortadela", "Butifarra", "Morcilla", "Kumis", "Yogur",
+    "Arepa", "Pan de Bono", "Almojábana", "Suero", "Mantequilla", "Tocineta", "Lomo", "Costilla",
+    "Salchicha", "Pechuga", "Longaniza", "Paté", "Cuajada", "Crema de Leche", "Arequipe", "Bocadillo",
+    "Panela", "Café", "Chocolate", "Fríjol", "Lenteja", "Garbanzo", "Arroz", "Aceite", "Atún", "Sardina",
+]
+_QUALIFIERS = [
+    "Serrano", "Ahumado", "Campesino", "Costeño", "Añejo", "Picante", "de Cerdo", "de Res", "de Pavo",
+    "Light", "Tajado", "Doble Crema", "Santarrosano", "Cervecero", "Premium", "Tradicional", "Orgánico",
+    "Artesanal", "Sin Sal", "Español", "Paisa", "Pastuso", "Mozzarella", "Descremado", "Integral",
+]
+_SIZES = ["125 g", "250 g", "500 g", "1 kg", "x6", "x12", "Familiar", "Mini", "1 L", "200 ml"]
+
+
+def _price(rng: random.Random) -> float:
+    # Precios en pesos, redondeados a 50 como en la lista real
+    return float(round(rng.lognormvariate(9.2, 0.8) / 50) * 50 or 50)
+
+
+def catalog_rows(products: int, categories: int, suppliers: int, seed: int = 42) -> Dict[str, List]:
+    """Nombres de categorias, proveedores y filas de productos (sin ids de FK resueltos)."""
+    from app.core.text import normalize_name
+
+    rng = random.Random(seed)
+    category_names = [
+        CATEGORIES[i % len(CATEGORIES)] + ("" if i < len(CATEGORIES) else f" {i // len(CATEGORIES) + 1}")
+        for i in range(categories)
+    ]
+    supplier_names = []
+    for i in range(suppliers):
+        prefix = _SUPPLIER_PREFIXES[i % len(_SUPPLIER_PREFIXES)]
+        name = _SUPPLIER_NAMES[(i // len(_SUPPLIER_PREFIXES)) % len(_SUPPLIER_NAMES)]
+        lap = i // (len(_SUPPLIER_PREFIXES) * len(_SUPPLIER_NAMES))
+        supplier_names.append(f"{prefix} {name}" + (f" {lap + 1}" if lap else ""))
+
+    rows, seen = [], set()
+    while len(rows) < products:
+        name = f"{rng.choice(_BASES)} {rng.choice(_QUALIFIERS)} {rng.choice(_SIZES)}"
+        key = normalize_name(name)
+        if key in seen:
+            # Combinaciones agotadas: se numera como un lote distinto
+            name = f"{name} Lote {len(rows)}"
+            key = normalize_name(name)
+        seen.add(key)
+        rows.append({
+            "name": name,
+            "name_key": key,
+            "price": _price(rng),
+            "categoria": rng.randrange(categories),
+            "supplier": rng.randrange(suppliers),
+        })
+    return {"categories": category_names, "suppliers": supplier_names, "products": rows}
+
+
+def generate(db: Session, products: int, categories: int = 12, suppliers: int = 30, seed: int = 42) -> Dict[str, int]:
+    """Inserta el catalogo sintetico (reutiliza categorias y proveedores existentes)."""
+    from app import catalog
+    from app.db import CategoryDB, ProductDB, SupplierDB
+
+    data = catalog_rows(products, categories, suppliers, seed)
+
+    def ensure(model, names):
+        existing = dict(db.execute(select(model.name, model.id)).all())
+        missing = [{"name": n} for n in names if n not in existing]
+        if missing:
+            db.execute(insert(model), missing)
+            existing = dict(db.execute(select(model.name, model.id)).all())
+        return [existing[n] for n in names]
+
+    category_ids = ensure(CategoryDB, data["categories"])
+    supplier_ids = ensure(SupplierDB, data["suppliers"])
+    taken = set(db.scalars(select(ProductDB.name_key)))
+    rows = [
+        {
+            "name": p["name"],
+            "name_key": p["name_key"],
+            "price": p["price"],
+            "categoria_id": category_ids[p["categoria"]],
+            "supplier_id": supplier_ids[p["supplier"]],
+        }
+        for p in data["products"]
+        if p["name_key"] not in taken
+    ]
+    for start in range(0, len(rows), 1000):
+        db.execute(insert(ProductDB), rows[start:start + 1000])
+    catalog.touch(db, "products", "categories", "suppliers")
+    db.commit()
+    return {"products": len(rows), "categories": len(category_ids), "suppliers": len(supplier_ids)}
+
+
+def prepare(products: int, categories: int = 12, suppliers: int = 30, seed: int = 42) -> Dict[str, int]:
+    """Prepara la base de DATABASE_URL (esquema, semillas, admin) y carga el catalogo."""
+    from app.db import SessionLocal
+    from app.manage import prepare_database
+
+    prepare_database()
+    with SessionLocal() as db:
+        return generate(db, products, categories, suppliers, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--suppliers", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(prepare(args.products, args.categories, args.suppliers, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Utilidades compartidas por los benchmarks (carga concurrente y percentiles)."""
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Sequence
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """Resumen en milisegundos y peticiones por segundo."""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_load(app, make_request: Callable[[int], tuple], total: int, concurrency: int) -> Dict[str, float]:
+    """
+    Lanza `total` peticiones contra una app ASGI en proceso con `concurrency`
+    clientes simultaneos. make_request(i) devuelve (metodo, url, kwargs).
+    El lifespan de la app (preparar la base) corre antes de la carga.
+    """
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport no ejecuta el lifespan; se corre aqui como lo haria el servidor
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                method, url, kwargs = make_request(i)
+                start = time.perf_counter()
+                res = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if res.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, elapsed, errors)
+
+
+def run_metadata() -> Dict[str, object]:
+    """Commit, fecha y entorno del resultado, para comparar corridas entre commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip())
+    except OSError:
+        commit, dirty = None, False
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+
+def temp_database_url() -> str:
+    fd, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+    os.close(fd)
+    os.unlink(path)
+    return f"sqlite:///{path}"
+
+
+def remove_database(url: str) -> None:
+    """Borra la base temporal y sus archivos asociados (WAL y lock de inicializacion)."""
+    path = url.replace("sqlite:///", "", 1)
+    for suffix in ("", "-wal", "-shm", ".init.lock"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+def run_isolated(module: str, env: Dict[str, str], *args: str) -> dict:
+    """
+    Ejecuta `python -m module` en un proceso nuevo (la configuracion se lee al
+    importar app) y devuelve el JSON que imprime en la ultima linea.
+    """
+    full_env = {**os.environ, **env}
+    out = subprocess.run(
+        [sys.executable, "-m", module, *args],
+        cwd=BACKEND_DIR,
+        env=full_env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
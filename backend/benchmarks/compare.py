@@ -0,0 +1,66 @@
+"""
+Compara dos resultados JSON de bench_micro / bench_load (p. ej. de dos commits)
+y marca las regresiones de latencia o throughput por encima del umbral.
+Sale con codigo 1 si hay regresiones, para usarlo en CI.
+
+Uso (desde backend/):
+    python -m benchmarks.compare base.json nuevo.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+# Metricas que se comparan; True si mas alto es mejor
+METRICS = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "rps": True, "per_call_us": False}
+
+
+def _flatten(results: dict, prefix: str = "") -> Iterator[Tuple[str, str, float]]:
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}/")
+        elif key in METRICS and isinstance(value, (int, float)):
+            yield prefix.rstrip("/"), key, float(value)
+
+
+def compare(base: dict, new: dict, threshold: float = 10.0) -> Dict[str, list]:
+    """Filas (caso, metrica, base, nuevo, cambio %) y las que son regresion."""
+    before = {(case, metric): value for case, metric, value in _flatten(base.get("results", base))}
+    rows, regressions = [], []
+    for case, metric, value in _flatten(new.get("results", new)):
+        old = before.get((case, metric))
+        if old is None or old == 0:
+            continue
+        change = (value - old) / old * 100
+        row = (case, metric, old, value, round(change, 1))
+        rows.append(row)
+        worse = -change if METRICS[metric] else change
+        if worse > threshold:
+            regressions.append(row)
+    return {"rows": rows, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Porcentaje tolerado antes de marcar regresion")
+    args = parser.parse_args()
+
+    with open(args.base) as handle:
+        base = json.load(handle)
+    with open(args.new) as handle:
+        new = json.load(handle)
+    report = compare(base, new, args.threshold)
+
+    print(f"base: {base.get('meta', {}).get('commit')}  nuevo: {new.get('meta', {}).get('commit')}")
+    flagged = set(report["regressions"])
+    for case, metric, old, value, change in report["rows"]:
+        mark = "  REGRESION" if (case, metric, old, value, change) in flagged else ""
+        print(f"{case:45} {metric:12} {old:>10.3f} -> {value:>10.3f} ({change:+.1f}%){mark}")
+    print(f"{len(flagged)} regresiones (umbral {args.threshold}%)")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
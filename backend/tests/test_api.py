@@ -1,6 +1,9 @@
+import base64
+import json
 from fastapi.testclient import TestClient
 from app.main import app
 from app.db import Base, engine, SessionLocal, CategoryDB, SupplierDB
+from app.manage import prepare_database
 
 client = TestClient(app)
 
@@ -20,7 +23,8 @@ def _unique(name: str) -> str:
     return f"{name}_{int(time.time() * 1000)}"
 
 # --- SETUP (asegura base limpia) ---
-Base.metadata.create_all(bind=engine)
+# TestClient sin `with` no ejecuta el lifespan: se prepara la base aqui
+prepare_database()
 db = SessionLocal()
 
 # Crea datos de base si no existen
@@ -179,3 +183,920 @@ def test_suppliers_crud_protected():
     )
     assert res.status_code == 204
 
+
+
+def test_near_duplicate_product_name():
+    """Un nombre que solo difiere en tildes/signos se rechaza con 409."""
+    token = _get_token()
+    name = _unique("Jamón Serrano")
+    res = client.post(
+        "/products",
+        json={"name": name, "price": 1000, "categoria_id": 1, "supplier_id": 1},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 201
+    product_id = res.json()["id"]
+
+    res = client.post(
+        "/products",
+        json={"name": name.replace("ó", "o").upper() + "!", "price": 1000, "categoria_id": 1, "supplier_id": 1},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 409
+
+    client.delete(f"/products/{product_id}", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    """Una base con el esquema original recibe columnas, backfill e indices."""
+    from sqlalchemy import create_engine, inspect, text
+    from app.db import Base
+    from app.migrations import HEAD, applied_versions, upgrade
+
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as conn:
+        conn.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE NOT NULL)"))
+        conn.execute(text("CREATE TABLE suppliers (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE NOT NULL, phone VARCHAR, email VARCHAR)"))
+        conn.execute(text(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE NOT NULL, price FLOAT NOT NULL, "
+            "categoria_id INTEGER NOT NULL REFERENCES categories(id), supplier_id INTEGER NOT NULL REFERENCES suppliers(id))"
+        ))
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR UNIQUE NOT NULL, email VARCHAR, hashed_password VARCHAR NOT NULL)"))
+        conn.execute(text("INSERT INTO products (name, price, categoria_id, supplier_id) VALUES ('Salchichón Cervecero', 1, 1, 1)"))
+
+    Base.metadata.create_all(bind=legacy)
+    assert len(upgrade(legacy)) == HEAD
+    assert upgrade(legacy) == []
+    assert max(applied_versions(legacy)) == HEAD
+
+    with legacy.connect() as conn:
+        key = conn.execute(text("SELECT name_key FROM products")).scalar()
+        plan = " ".join(str(r[-1]) for r in conn.execute(text("EXPLAIN QUERY PLAN SELECT count(id) FROM products WHERE supplier_id = 1")))
+        indexes = set(conn.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'products'")))
+    assert key == "salchichon cervecero"
+    assert "ix_products_supplier_id" in plan
+    assert {"ix_products_lower_name", "ix_products_categoria_id_name", "ix_products_price_id"} <= indexes
+    assert "token_version" in {c["name"] for c in inspect(legacy).get_columns("users")}
+    legacy.dispose()
+
+
+def test_search_products_accent_insensitive():
+    """La busqueda ignora tildes y sigue los cambios de nombre."""
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    name = _unique("Morcilla Añeja")
+    res = client.post(
+        "/products",
+        json={"name": name, "price": 2500, "categoria_id": 1, "supplier_id": 1},
+        headers=headers,
+    )
+    assert res.status_code == 201
+    product_id = res.json()["id"]
+
+    res = client.get("/products", params={"q": "morcilla aneja", "limit": 100})
+    assert res.status_code == 200
+    assert product_id in [p["id"] for p in res.json()]
+    assert int(res.headers["X-Total-Count"]) >= 1
+
+    client.put(f"/products/{product_id}", json={"name": _unique("Longaniza")}, headers=headers)
+    res = client.get("/products", params={"q": name, "limit": 100})
+    assert product_id not in [p["id"] for p in res.json()]
+
+    client.delete(f"/products/{product_id}", headers=headers)
+
+
+def test_cursor_pagination_matches_offset():
+    """El modo cursor recorre los mismos productos que el modo offset."""
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    created = []
+    for i in range(5):
+        res = client.post(
+            "/products",
+            json={"name": _unique(f"Cursor {i}"), "price": 100, "categoria_id": 1 + i % 2, "supplier_id": 1},
+            headers=headers,
+        )
+        created.append(res.json()["id"])
+
+    for sort in ("name", "price", "categoria"):
+        for order in ("asc", "desc"):
+            params = {"sort": sort, "order": order, "limit": 100}
+            expected = [p["id"] for p in client.get("/products", params=params).json()]
+
+            seen, cursor = [], ""
+            while cursor is not None:
+                res = client.get("/products", params={**params, "limit": 2, "cursor": cursor})
+                assert res.status_code == 200
+                seen += [p["id"] for p in res.json()]
+                cursor = res.headers.get("X-Next-Cursor")
+            assert seen[: len(expected)] == expected
+
+    res = client.get("/products", params={"cursor": "no-es-un-cursor"})
+    assert res.status_code == 400
+
+    # Cursores armados a mano con un valor que no es del tipo del orden
+    for sort, value in (("price", "abc"), ("price", True), ("price", None), ("name", 5), ("categoria", [1]), ("name", {"a": 1})):
+        raw = json.dumps({"s": sort, "o": "asc", "k": value, "id": 1}).encode()
+        forged = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+        res = client.get("/products", params={"sort": sort, "cursor": forged})
+        assert res.status_code == 400
+        assert res.json()["detail"] == "Cursor invalido"
+
+    for product_id in created:
+        client.delete(f"/products/{product_id}", headers=headers)
+
+
+def test_list_products_total_optional_and_cached():
+    """include_total=false omite el conteo; el total cacheado se invalida al escribir."""
+    res = client.get("/products", params={"include_total": "false"})
+    assert res.status_code == 200
+    assert "X-Total-Count" not in res.headers
+
+    before = int(client.get("/products").headers["X-Total-Count"])
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post(
+        "/products",
+        json={"name": _unique("Total"), "price": 10, "categoria_id": 1, "supplier_id": 1},
+        headers=headers,
+    )
+    product_id = res.json()["id"]
+    assert int(client.get("/products").headers["X-Total-Count"]) == before + 1
+
+    # Una pagina fuera de rango conserva el total
+    res = client.get("/products", params={"offset": before + 10})
+    assert res.json() == []
+    assert int(res.headers["X-Total-Count"]) == before + 1
+
+    client.delete(f"/products/{product_id}", headers=headers)
+    assert int(client.get("/products").headers["X-Total-Count"]) == before
+
+
+def test_categories_cache_hits_and_invalidation():
+    """Las lecturas repetidas salen del cache y las escrituras lo invalidan."""
+    client.get("/categories")
+    hits = client.get("/cache/stats").json()["categories"]["hits"]
+    first = client.get("/categories").json()
+    assert client.get("/cache/stats").json()["categories"]["hits"] == hits + 1
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post("/categories", json={"name": _unique("CacheCat")}, headers=headers)
+    cat_id = res.json()["id"]
+    assert len(client.get("/categories").json()) == len(first) + 1
+    assert client.get(f"/categories/{cat_id}").json()["id"] == cat_id
+
+    client.delete(f"/categories/{cat_id}", headers=headers)
+    assert client.get(f"/categories/{cat_id}").status_code == 404
+    assert len(client.get("/categories").json()) == len(first)
+
+
+def test_categories_cache_ignores_load_raced_by_write():
+    """Una carga que termina despues de una escritura no deja datos viejos en el cache."""
+    from sqlalchemy import event
+    from app import catalog
+    from app.api.routes import categories
+
+    headers = {"Authorization": f"Bearer {_get_token()}"}
+    name = _unique("RaceCat")
+    db = SessionLocal()
+
+    def write_after_read(state):
+        # Se leen las filas y, antes de guardarlas en cache, se confirma otra escritura
+        event.remove(db, "do_orm_execute", write_after_read)
+        frozen = state.invoke_statement().freeze()
+        writer = SessionLocal()
+        writer.add(CategoryDB(name=name))
+        catalog.touch(writer, "categories")
+        writer.commit()
+        writer.close()
+        return frozen()
+
+    categories._cache.clear()
+    event.listen(db, "do_orm_execute", write_after_read)
+    try:
+        stale = json.loads(categories.list_categories(db).body)
+    finally:
+        db.close()
+    assert name not in [c["name"] for c in stale]
+
+    listed = client.get("/categories").json()
+    created = [c["id"] for c in listed if c["name"] == name]
+    assert created
+    client.delete(f"/categories/{created[0]}", headers=headers)
+
+
+def test_conditional_get_etag_and_304():
+    """Los GET publicos devuelven ETag y responden 304 hasta que hay escrituras."""
+    res = client.get("/suppliers")
+    etag = res.headers["ETag"]
+    assert "max-age" in res.headers["Cache-Control"]
+
+    res = client.get("/suppliers", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post("/suppliers", json={"name": _unique("EtagSup")}, headers=headers)
+    sup_id = res.json()["id"]
+
+    res = client.get("/suppliers", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    last_modified = res.headers["Last-Modified"]
+    assert client.get("/suppliers", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    # "*" solo aplica a recursos que existen
+    assert client.get(f"/suppliers/{sup_id}", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/suppliers/999999", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/products/999999", headers={"If-None-Match": "*"}).status_code == 404
+
+    client.delete(f"/suppliers/{sup_id}", headers=headers)
+
+
+def test_bulk_import_legacy_encoding():
+    """CSV en cp1252 (Excel): se detecta; con una codificacion explicita invalida es 400 sin guardar nada."""
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    base = _unique("Encoding")
+    rows = "".join(f"{base} Jamon {i},{1000 + i},Lacteos,1\n" for i in range(1200))
+    csv_body = ("name,price,categoria,supplier_id\n" + rows + f"{base} Jamón Serrano,2500,Lacteos,1\n").encode("cp1252")
+
+    res = client.post(
+        "/products/bulk", params={"encoding": "utf-8"},
+        files={"file": ("lista.csv", csv_body, "text/csv")}, headers=headers,
+    )
+    assert res.status_code == 400
+    assert "linea 1202" in res.json()["detail"]
+    assert client.get("/products", params={"q": f"{base} Jamon 1"}).headers["x-total-count"] == "0"
+
+    res = client.post("/products/bulk", files={"file": ("lista.csv", csv_body, "text/csv")}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["inserted"] == 1201
+    names = [p["name"] for p in client.get("/products", params={"q": f"{base} jamon serrano"}).json()]
+    assert names == [f"{base} Jamón Serrano"]
+    assert client.post(
+        "/products/bulk", params={"encoding": "klingon"},
+        files={"file": ("lista.csv", csv_body, "text/csv")}, headers=headers,
+    ).status_code == 400
+
+    from app.db import ProductDB
+    with SessionLocal() as session:
+        session.query(ProductDB).filter(ProductDB.name.like(f"{base}%")).delete(synchronize_session=False)
+        session.commit()
+
+
+def test_bulk_import_csv_and_jsonl():
+    """La importacion masiva resuelve nombres, detecta duplicados y reporta errores por fila."""
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    base = _unique("Bulk")
+    csv_body = (
+        "name,price,categoria,supplier_id\n"
+        f"{base} Queso,1200,lacteos,1\n"
+        f"{base} Quesó,1300,Lacteos,1\n"
+        f"{base} Sin Precio,,Lacteos,1\n"
+        f"{base} Otro,500,NoExiste,1\n"
+    )
+    res = client.post(
+        "/products/bulk",
+        files={"file": ("lista.csv", csv_body.encode(), "text/csv")},
+        headers=headers,
+    )
+    assert res.status_code == 200
+    report = res.json()
+    assert report["inserted"] == 1
+    assert report["total_rows"] == 4
+    assert sorted(e["row"] for e in report["errors"]) == [3, 4, 5]
+
+    jsonl_body = (
+        json.dumps({"name": f"{base} queso", "price": 1500, "categoria_id": 1, "supplier_id": 1}) + "\n"
+        + "no es json\n"
+    )
+    res = client.post(
+        "/products/bulk?mode=upsert",
+        files={"file": ("lista.jsonl", jsonl_body.encode(), "application/x-ndjson")},
+        headers=headers,
+    )
+    report = res.json()
+    assert report["updated"] == 1 and report["inserted"] == 0
+    assert report["errors"][0]["row"] == 2
+
+    res = client.get("/products", params={"q": f"{base} queso", "limit": 100})
+    products = res.json()
+    assert [p["price"] for p in products] == [1500]
+    client.delete(f"/products/{products[0]['id']}", headers=headers)
+
+
+def test_bulk_import_conflict_keeps_valid_rows():
+    """Un conflicto al guardar descarta solo esa fila; el resto del lote se guarda."""
+    from app.db import ProductDB
+    headers = {"Authorization": f"Bearer {_get_token()}"}
+    base = _unique("Conflicto")
+    # Fila con name_key desactualizado: escapa a la deteccion previa y choca con el UNIQUE de name
+    with SessionLocal() as session:
+        session.add(ProductDB(name=f"{base} Legado", price=100, categoria_id=1, supplier_id=1, name_key=f"stale {base}"))
+        session.commit()
+
+    csv_body = (
+        "name,price,categoria_id,supplier_id\n"
+        f"{base} Uno,100,1,1\n"
+        f"{base} Legado,200,1,1\n"
+        f"{base} Dos,300,1,1\n"
+        f"{base} uno,400,1,1\n"
+    )
+    res = client.post("/products/bulk", files={"file": ("lista.csv", csv_body.encode(), "text/csv")}, headers=headers)
+    report = res.json()
+    assert report["inserted"] == 2
+    assert sorted((e["row"], e["error"]) for e in report["errors"]) == [
+        (3, "Conflicto al guardar (nombre duplicado)"),
+        (5, "Duplicado de la fila 2 en el archivo"),
+    ]
+
+    with SessionLocal() as session:
+        assert session.query(ProductDB).filter(ProductDB.name.like(f"{base}%")).count() == 3
+        session.query(ProductDB).filter(ProductDB.name.like(f"{base}%")).delete(synchronize_session=False)
+        session.commit()
+
+
+def test_reprice_rule_and_items():
+    """Cambio de precios por regla (con dry-run) y por lista explicita."""
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post("/suppliers", json={"name": _unique("RepriceSup")}, headers=headers)
+    sup_id = res.json()["id"]
+    ids = []
+    for price in (1000, 1980):
+        res = client.post(
+            "/products",
+            json={"name": _unique(f"Reprice {price}"), "price": price, "categoria_id": 1, "supplier_id": sup_id},
+            headers=headers,
+        )
+        ids.append(res.json()["id"])
+
+    rule = {"percent": 7, "round_to": 50, "supplier_id": sup_id}
+    res = client.post("/products/reprice", json={"rule": rule, "dry_run": True}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["affected"] == 2
+    assert [p["new_price"] for p in res.json()["preview"]] == [1050, 2100]
+    assert client.get(f"/products/{ids[0]}").json()["price"] == 1000
+
+    res = client.post("/products/reprice", json={"rule": rule}, headers=headers)
+    assert res.json()["affected"] == 2
+    assert client.get(f"/products/{ids[1]}").json()["price"] == 2100
+
+    res = client.post(
+        "/products/reprice",
+        json={"items": [{"id": ids[0], "price": 999}, {"id": 987654321, "price": 1}]},
+        headers=headers,
+    )
+    assert res.json()["affected"] == 1
+    assert res.json()["missing_ids"] == [987654321]
+    assert client.get(f"/products/{ids[0]}").json()["price"] == 999
+
+    assert client.post("/products/reprice", json={}, headers=headers).status_code == 422
+    # Una regla sin alcance no toca todo el catalogo salvo con all=true explicito
+    res = client.post("/products/reprice", json={"rule": {"percent": 10}}, headers=headers)
+    assert res.status_code == 422
+    assert "all=true" in res.text
+    res = client.post("/products/reprice", json={"rule": {"percent": 10, "all": True}, "dry_run": True}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["affected"] >= 2
+    assert client.get(f"/products/{ids[0]}").json()["price"] == 999
+
+    for product_id in ids:
+        client.delete(f"/products/{product_id}", headers=headers)
+    client.delete(f"/suppliers/{sup_id}", headers=headers)
+
+
+def test_export_catalog_formats():
+    """La exportacion incluye todo el catalogo con nombres de categoria y proveedor."""
+    total = int(client.get("/products").headers["X-Total-Count"])
+
+    res = client.get("/products/export")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    lines = res.text.strip().splitlines()
+    assert lines[0] == "id,name,price,categoria_id,categoria,supplier_id,supplier"
+    assert len(lines) == total + 1
+
+    res = client.get("/products/export", params={"format": "jsonl"})
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert len(rows) == total
+    assert all(row["categoria"] and row["supplier"] for row in rows)
+
+    res = client.get("/products/export", params={"format": "txt"})
+    assert res.status_code == 200
+    assert "$" in res.text or total == 0
+
+
+def test_async_crud_handlers():
+    """Los handlers async (ASYNC_DB) responden igual que los sincronos."""
+    import pytest
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    from fastapi import FastAPI
+    from app.api.routes.async_catalog import categories_router, products_router
+
+    async_app = FastAPI()
+    async_app.include_router(categories_router)
+    async_app.include_router(products_router)
+    async_client = TestClient(async_app)
+    headers = {"Authorization": f"Bearer {_get_token()}"}
+
+    assert async_client.get("/categories").json() == client.get("/categories").json()
+
+    name = _unique("Async Chorizo")
+    res = async_client.post(
+        "/products",
+        json={"name": name, "price": 3200, "categoria_id": 1, "supplier_id": 1},
+        headers=headers,
+    )
+    assert res.status_code == 201
+    product_id = res.json()["id"]
+    assert client.get(f"/products/{product_id}").json()["name"] == name
+
+    res = async_client.post(
+        "/products",
+        json={"name": name.upper(), "price": 1, "categoria_id": 1, "supplier_id": 1},
+        headers=headers,
+    )
+    assert res.status_code == 409
+
+    expanded = "category,supplier"
+    assert (
+        async_client.get(f"/products/{product_id}", params={"expand": expanded}).json()
+        == client.get(f"/products/{product_id}", params={"expand": expanded}).json()
+    )
+
+    res = async_client.put(f"/products/{product_id}", json={"price": 3300}, headers=headers)
+    assert res.json()["price"] == 3300
+    assert async_client.delete(f"/products/{product_id}", headers=headers).status_code == 204
+    assert async_client.get(f"/products/{product_id}").status_code == 404
+
+
+def test_login_does_not_hash_passwords(monkeypatch):
+    """El login ya no recrea el admin: no calcula hashes nuevos por peticion."""
+    import app.auth.auth as auth_module
+    import app.auth.dependencies as deps
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no se deberia calcular un hash en el login")
+
+    monkeypatch.setattr(deps, "hash_password", fail)
+    monkeypatch.setattr(auth_module, "hash_password_async", fail)
+    assert _get_token()
+
+
+def test_cached_principal_skips_user_query():
+    """Con el usuario en cache, las rutas protegidas no consultan la tabla users."""
+    from sqlalchemy import event
+    from app.auth.auth import create_access_token
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/login/me", headers=headers).status_code == 200
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        me = client.get("/login/me", headers=headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert me["username"] == "admin"
+    assert not [s for s in statements if "FROM users" in s]
+
+    stale = create_access_token({"sub": "admin", "uid": me["id"], "ver": 999})
+    res = client.get("/login/me", headers={"Authorization": f"Bearer {stale}"})
+    assert res.status_code == 401
+
+
+def test_sqlite_pragmas_applied():
+    """El perfil tuned aplica WAL y busy_timeout en cada conexion."""
+    from app.core.config import settings
+
+    with engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        busy = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+    if settings.DB_ENGINE_PROFILE == "tuned":
+        assert journal.lower() == settings.DB_SQLITE_JOURNAL_MODE.lower()
+        assert busy == settings.DB_SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_reads_routed_to_replica_with_read_your_writes(tmp_path, monkeypatch):
+    """Los GET leen de la replica; quien acaba de escribir lee del primario."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import db_routing
+    from app.core.config import settings
+    from app.db import ProductDB
+
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica)
+    with sessionmaker(bind=replica)() as rdb:
+        rdb.add_all([CategoryDB(id=1, name="Lacteos"), SupplierDB(id=1, name="Burbano Family")])
+        rdb.add(ProductDB(id=987654, name="Solo en replica", price=1, categoria_id=1, supplier_id=1))
+        rdb.commit()
+
+    monkeypatch.setattr(db_routing, "REPLICA_ENABLED", True)
+    monkeypatch.setattr(db_routing, "ReadSessionLocal", sessionmaker(bind=replica, autoflush=False))
+    monkeypatch.setattr(settings, "READ_REPLICA_MAX_LAG_SECONDS", 0)
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/products/987654").json()["name"] == "Solo en replica"
+    assert client.get("/products/987654", headers=headers).status_code == 200
+
+    res = client.post(
+        "/products",
+        json={"name": _unique("Queso Replica"), "price": 100, "categoria_id": 1, "supplier_id": 1},
+        headers=headers,
+    )
+    assert res.status_code == 201
+    # El admin que escribio lee del primario; el publico sigue en la replica
+    assert client.get("/products/987654", headers=headers).status_code == 404
+    assert client.get(f"/products/{res.json()['id']}", headers=headers).status_code == 200
+    assert client.get("/products/987654").status_code == 200
+
+    # Con un cambio reciente del catalogo todos leen del primario
+    monkeypatch.setattr(settings, "READ_REPLICA_MAX_LAG_SECONDS", 60)
+    assert client.get("/products/987654").status_code == 404
+
+    client.delete(f"/products/{res.json()['id']}", headers=headers)
+    replica.dispose()
+
+
+def test_catalog_snapshot_matches_live_queries(monkeypatch):
+    """El snapshot devuelve las mismas paginas, totales y cursores que la consulta en vivo."""
+    from app.core.config import settings
+    from app.snapshot import snapshot
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = []
+    for name, price in [("Jamón Serrano", 9000), ("jamon ahumado", 9000), ("Queso Costeño", 4500)]:
+        res = client.post(
+            "/products",
+            json={"name": _unique(name), "price": price, "categoria_id": 2, "supplier_id": 1},
+            headers=headers,
+        )
+        ids.append(res.json()["id"])
+
+    cases = [
+        {},
+        {"sort": "price", "order": "desc", "offset": 1, "limit": 2},
+        {"sort": "categoria", "limit": 3},
+        {"q": "jamon", "sort": "price"},
+        {"q": "ja", "order": "desc"},
+        {"sort": "price", "order": "desc", "cursor": "", "limit": 1},
+    ]
+
+    def pages(params):
+        res = client.get("/products", params=params)
+        result = [(res.json(), res.headers.get("x-total-count"))]
+        while res.headers.get("x-next-cursor"):
+            res = client.get("/products", params={**params, "cursor": res.headers["x-next-cursor"]})
+            result.append((res.json(), res.headers.get("x-total-count")))
+        return result
+
+    monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_ENABLED", False)
+    live = [pages(params) for params in cases]
+    monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_ENABLED", True)
+    snapshot.refresh()
+    hits = snapshot.hits
+    assert [pages(params) for params in cases] == live
+    assert snapshot.hits > hits
+
+    for product_id in ids:
+        client.delete(f"/products/{product_id}", headers=headers)
+    # Tras un cambio el snapshot queda desactualizado y se usa la consulta en vivo
+    assert snapshot.current() is None
+    assert not {p["id"] for p in client.get("/products", params={"limit": 100}).json()} & set(ids)
+
+
+def test_snapshot_incremental_build_matches_full_build():
+    """Reconstruir parcheando los ordenes da lo mismo que reconstruir desde cero."""
+    from app.core.cache import TTLCache
+    from app.snapshot import build
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = []
+    for name, price in [("Arepa Boyacense", 3000), ("Chorizo Santarrosano", 7000), ("Bocadillo Veleño", 1500)]:
+        res = client.post(
+            "/products",
+            json={"name": _unique(name), "price": price, "categoria_id": 1, "supplier_id": 1},
+            headers=headers,
+        )
+        ids.append(res.json()["id"])
+
+    def same(a, b):
+        for sort in a.orders:
+            assert [r.id for r in a.orders[sort]] == [r.id for r in b.orders[sort]]
+            assert a._keys[sort] == b._keys[sort]
+
+    first = build()
+    # Solo cambia un precio: el orden por nombre se reutiliza tal cual
+    client.put(f"/products/{ids[0]}", json={"price": 99999}, headers=headers)
+    second = build(first)
+    same(second, build())
+    assert second._keys["name"] is first._keys["name"]
+    assert second._keys["price"] is not first._keys["price"]
+
+    client.put(f"/products/{ids[1]}", json={"name": _unique("Almojabana"), "categoria_id": 2}, headers=headers)
+    client.delete(f"/products/{ids[2]}", headers=headers)
+    third = build(second)
+    same(third, build())
+
+    # Las busquedas cacheadas se acotan por filas totales
+    cache = TTLCache(maxsize=10, ttl=60, maxweight=5)
+    cache.set("a", [1, 2, 3])
+    cache.set("b", [4, 5, 6])
+    assert cache.get("a") is None and cache.weight == 3
+    cache.set("c", list(range(6)))
+    assert cache.get("c") is None and cache.get("b") == [4, 5, 6]
+
+    for product_id in ids[:2]:
+        client.delete(f"/products/{product_id}", headers=headers)
+
+
+def test_response_compression_negotiated():
+    """gzip segun Accept-Encoding, con umbral de tamano, ETag debil y streaming."""
+    import gzip
+    from app.compression import brotli, choose_encoding
+
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0, *") == ("br" if brotli is not None else None)
+    assert choose_encoding("br;q=0, gzip;q=0, *;q=0.5") is None
+
+    params = {"limit": 100}
+    plain = client.get("/products", params=params, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    # httpx descomprime el cuerpo; se compara contra la respuesta sin comprimir
+    res = client.get("/products", params=params, headers={"Accept-Encoding": "gzip"})
+    if len(plain.content) >= 1024:
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.headers["etag"] == f"W/{plain.headers['etag']}"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert res.json() == plain.json()
+
+    again = client.get("/products", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": res.headers["etag"]})
+    assert again.status_code == 304
+
+    small = client.get("/categories/1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    # Streaming: cada bloque se comprime sin esperar al final de la respuesta
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from app.compression import CompressionMiddleware
+
+    stream_app = FastAPI()
+    stream_app.add_middleware(CompressionMiddleware, minimum_size=16)
+    rows = [f"{i},Producto {i}\n" for i in range(2000)]
+    stream_app.get("/export")(lambda: StreamingResponse(iter(rows), media_type="text/csv"))
+    with TestClient(stream_app).stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as export:
+        raw = b"".join(export.iter_raw())
+    assert export.headers["content-encoding"] == "gzip"
+    assert "content-length" not in export.headers
+    assert gzip.decompress(raw).decode() == "".join(rows)
+
+
+def test_metrics_and_server_timing(monkeypatch, caplog):
+    """Cada respuesta lleva Server-Timing y /metrics acumula por plantilla de ruta."""
+    import logging
+    from app.core.config import settings
+
+    product_id = client.get("/products", params={"limit": 1}).json()[0]["id"]
+    monkeypatch.setattr(settings, "METRICS_SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        res = client.get(f"/products/{product_id}")
+    assert res.status_code == 200
+    timing = res.headers["server-timing"]
+    assert timing.startswith("app;dur=") and "db;dur=" in timing
+    assert "1 filas" in timing
+    assert any("Consulta lenta" in r.getMessage() and "/products/{product_id}" in r.getMessage() for r in caplog.records)
+
+    body = client.get("/metrics").text
+    labels = 'method="GET",route="/products/{product_id}"'
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}' in body
+    assert f'http_requests_total{{{labels},status="200"}}' in body
+    statements = [l for l in body.splitlines() if l.startswith(f"db_statements_total{{{labels}}}")]
+    rows = [l for l in body.splitlines() if l.startswith(f"db_rows_fetched_total{{{labels}}}")]
+    assert statements and int(statements[0].split()[-1]) >= 1
+    assert rows and int(rows[0].split()[-1]) >= 1
+    assert f"/products/{product_id}\"" not in body  # la URL concreta no se usa como etiqueta
+
+
+def test_batch_get_products():
+    """Varios productos por id: orden pedido, sin repetidos y con los inexistentes aparte."""
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = []
+    for price in (700, 800):
+        res = client.post(
+            "/products",
+            json={"name": _unique(f"Batch {price}"), "price": price, "categoria_id": 1, "supplier_id": 1},
+            headers=headers,
+        )
+        ids.append(res.json()["id"])
+
+    res = client.post("/products/batch-get", json={"ids": [ids[1], 987654321, ids[0], ids[1]]})
+    assert res.status_code == 200
+    body = res.json()
+    assert [p["id"] for p in body["items"]] == [ids[1], ids[0]]
+    assert body["items"][0] == client.get(f"/products/{ids[1]}").json()
+    assert body["missing"] == [987654321]
+
+    assert client.post("/products/batch-get", json={"ids": list(range(1, 502))}).status_code == 422
+    assert client.post("/products/batch-get", json={"ids": []}).status_code == 422
+    for product_id in ids:
+        client.delete(f"/products/{product_id}", headers=headers)
+
+
+def test_expand_category_and_supplier(monkeypatch):
+    """expand embebe categoria y proveedor (snapshot y consulta en vivo); sin expand no cambian las respuestas."""
+    from app.core.config import settings
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    category = client.get("/categories/1").json()
+    supplier = client.get("/suppliers/1").json()
+    name = _unique("Expand Butifarra")
+    res = client.post(
+        "/products",
+        json={"name": name, "price": 2600, "categoria_id": 1, "supplier_id": 1},
+        headers=headers,
+    )
+    product_id = res.json()["id"]
+
+    plain = client.get(f"/products/{product_id}").json()
+    assert "category" not in plain and "supplier" not in plain
+    res = client.get(f"/products/{product_id}", params={"expand": "category,supplier"})
+    assert res.json() == {**plain, "category": category, "supplier": supplier}
+    res = client.get(f"/products/{product_id}", params={"expand": "supplier"})
+    assert res.json() == {**plain, "supplier": supplier}
+
+    for enabled in (True, False):
+        monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_ENABLED", enabled)
+        params = {"q": name, "expand": "category"}
+        items = client.get("/products", params=params).json()
+        assert items == [{**plain, "category": category}]
+        assert client.get("/products", params={"q": name}).json() == [plain]
+
+    res = client.post("/products/batch-get", params={"expand": "category"}, json={"ids": [product_id]})
+    assert res.json()["items"] == [{**plain, "category": category}]
+    assert client.get("/products", params={"expand": "precio"}).status_code == 400
+    client.delete(f"/products/{product_id}", headers=headers)
+
+
+def test_facet_filters_and_counts(monkeypatch):
+    """Filtros por categoria, proveedor y precio (snapshot y en vivo) y facetas cacheadas por filtro."""
+    from app.core.config import settings
+
+    token = _get_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    base = _unique("Faceta")
+    created = []
+    for suffix, price, categoria_id, supplier_id in (("a", 1000, 1, 1), ("b", 3000, 1, 2), ("c", 5000, 2, 2)):
+        res = client.post(
+            "/products",
+            json={"name": f"{base} {suffix}", "price": price, "categoria_id": categoria_id, "supplier_id": supplier_id},
+            headers=headers,
+        )
+        created.append(res.json()["id"])
+
+    for enabled in (True, False):
+        monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_ENABLED", enabled)
+        res = client.get("/products", params={"q": base, "categoria_id": 1, "limit": 100})
+        assert [p["id"] for p in res.json()] == created[:2]
+        assert res.headers["x-total-count"] == "2"
+        res = client.get("/products", params={"q": base, "supplier_id": 2, "min_price": 2000, "max_price": 4000})
+        assert [p["id"] for p in res.json()] == [created[1]]
+        res = client.get("/products", params={"q": base, "min_price": 2000, "sort": "price", "order": "desc"})
+        assert [p["id"] for p in res.json()] == [created[2], created[1]]
+    assert client.get("/products", params={"min_price": 10, "max_price": 5}).status_code == 400
+
+    res = client.get("/products/facets", params={"q": base})
+    assert res.status_code == 200
+    facets = res.json()
+    assert facets["total"] == 3
+    assert [(f["id"], f["count"]) for f in facets["categories"]] == [(1, 2), (2, 1)]
+    assert [(f["id"], f["count"]) for f in facets["suppliers"]] == [(2, 2), (1, 1)]
+    assert facets["price"] == {"min": 1000, "max": 5000, "avg": 3000}
+    assert client.get("/products/facets", params={"q": base, "categoria_id": 2}).json()["total"] == 1
+
+    # Cacheado por filtro e invalidado al escribir productos
+    from app.core.cache import caches
+    hits = caches["product_facets"].hits
+    client.get("/products/facets", params={"q": base})
+    assert caches["product_facets"].hits == hits + 1
+    client.put(f"/products/{created[0]}", json={"price": 2000}, headers=headers)
+    assert client.get("/products/facets", params={"q": base}).json()["price"]["min"] == 2000
+
+    for product_id in created:
+        client.delete(f"/products/{product_id}", headers=headers)
+
+
+def _sse_events(text: str) -> list:
+    """(id, data) de cada evento de un cuerpo text/event-stream."""
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "data" in fields:
+            events.append((fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+def test_change_stream_replays_from_last_event_id(monkeypatch):
+    """GET /catalog/events reenvia desde el registro los cambios posteriores a Last-Event-ID."""
+    from sqlalchemy import func
+    from app.core.config import settings
+    from app.db import ChangeLogDB
+
+    monkeypatch.setattr(settings, "CHANGE_STREAM_MAX_SECONDS", 0.2)
+    with SessionLocal() as session:
+        baseline = session.query(func.max(ChangeLogDB.id)).scalar() or 0
+
+    headers = {"Authorization": f"Bearer {_get_token()}"}
+    name = _unique("Stream Mortadela")
+    product = client.post(
+        "/products", json={"name": name, "price": 4100, "categoria_id": 1, "supplier_id": 1}, headers=headers
+    ).json()
+    client.put(f"/products/{product['id']}", json={"price": 4300}, headers=headers)
+    client.post("/products/reprice", json={"items": [{"id": product["id"], "price": 4400}]}, headers=headers)
+    client.delete(f"/products/{product['id']}", headers=headers)
+
+    res = client.get("/catalog/events", headers={"Last-Event-ID": str(baseline)})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(res.text)
+    assert [e["type"] for _, e in events] == ["product.created", "product.updated", "product.repriced", "product.deleted"]
+    assert events[0][1]["data"]["name"] == name
+    assert events[1][1]["data"]["price"] == 4300
+    assert events[2][1]["data"] == {"count": 1, "items": [{"id": product["id"], "price": 4400}]}
+    assert events[3][1]["id"] == product["id"]
+
+    # Reanudar desde el segundo evento (query param, para EventSource sin header)
+    res = client.get("/catalog/events", params={"last_event_id": events[1][0]})
+    assert [e["type"] for _, e in _sse_events(res.text)] == ["product.repriced", "product.deleted"]
+
+    # Un id desconocido pide recargar el catalogo
+    res = client.get("/catalog/events", headers={"Last-Event-ID": "999999999"})
+    assert _sse_events(res.text)[0][1] == {"type": "reset"}
+
+
+def test_change_broker_fan_out_and_overflow(monkeypatch):
+    """El broker reparte los cambios confirmados; una cola llena desconecta solo a ese suscriptor."""
+    import asyncio
+    from app.changes import OVERFLOW, Change, Subscriber, broker
+
+    headers = {"Authorization": f"Bearer {_get_token()}"}
+    name = _unique("Broker Salchichon")
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        first, second = broker.subscribe(loop), broker.subscribe(loop)
+        try:
+            res = await loop.run_in_executor(None, lambda: client.post(
+                "/categories", json={"name": name}, headers=headers
+            ))
+            category_id = res.json()["id"]
+            frames = [await asyncio.wait_for(s.queue.get(), timeout=5) for s in (first, second)]
+        finally:
+            broker.unsubscribe(first)
+            broker.unsubscribe(second)
+        return category_id, frames
+
+    category_id, frames = asyncio.run(main())
+    assert frames[0] is frames[1]  # el mismo evento serializado para todos
+    assert json.loads(frames[0].frame.decode().split("data: ", 1)[1])["data"] == {"name": name, "id": category_id}
+    client.delete(f"/categories/{category_id}", headers=headers)
+
+    async def overflow():
+        slow = Subscriber(asyncio.get_running_loop(), maxsize=2)
+        changes = [Change(i, b"") for i in range(3)]
+        return slow.offer(changes), [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+
+    accepted, queued = asyncio.run(overflow())
+    assert accepted is False and queued == [OVERFLOW]
+
+
+def test_change_stream_dropped_response_keeps_no_subscriber():
+    """Una respuesta descartada antes de empezar no deja un suscriptor ocupado."""
+    import asyncio
+    from app.api.routes.events import catalog_events
+    from app.changes import broker
+
+    before = broker.stats()["subscribers"]
+    response = asyncio.run(catalog_events(last_event_id=None, last_event_id_header=None))
+    assert response.media_type == "text/event-stream"
+    assert broker.stats()["subscribers"] == before
@@ -0,0 +1,20 @@
+from benchmarks.catalog import catalog_rows
+from benchmarks.compare import compare
+
+
+def test_catalog_generator_is_deterministic_and_unique():
+    """Nombres con tildes, claves normalizadas unicas y misma salida para la misma semilla."""
+    data = catalog_rows(9000, 25, 120, seed=7)
+    keys = [p["name_key"] for p in data["products"]]
+    assert len(keys) == len(set(keys)) == 9000
+    assert len(set(data["categories"])) == 25
+    assert len(set(data["suppliers"])) == 120
+    assert any(ch in p["name"] for p in data["products"] for ch in "áéíóúñ")
+    assert catalog_rows(50, 3, 3, seed=7) == catalog_rows(50, 3, 3, seed=7)
+
+
+def test_compare_flags_regressions():
+    base = {"results": {"mixed/c=8": {"rps": 200.0, "p95_ms": 50.0}}}
+    new = {"results": {"mixed/c=8": {"rps": 150.0, "p95_ms": 52.0}}}
+    report = compare(base, new, threshold=10)
+    assert [(case, metric) for case, metric, *_ in report["regressions"]] == [("mixed/c=8", "rps")]
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args, db_path, **env):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_does_not_touch_database(tmp_path):
+    """Importar app.main no crea tablas ni abre la base."""
+    db_path = tmp_path / "import.db"
+    _run(["-c", "import app.main"], db_path)
+    assert not db_path.exists()
+
+
+def test_manage_setup_and_lifespan(tmp_path):
+    """`python -m app.manage setup` prepara la base; un segundo arranque no duplica semillas."""
+    db_path = tmp_path / "setup.db"
+    out = _run(["-m", "app.manage", "setup"], db_path)
+    assert "setup: ok" in out.stdout
+
+    # Arranque con lifespan sobre la base ya preparada
+    _run(
+        ["-c", "import asyncio\nfrom app.main import app\n"
+               "async def main():\n    async with app.router.lifespan_context(app):\n        pass\n"
+               "asyncio.run(main())"],
+        db_path,
+    )
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM categories")).scalar() == 4
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 1
+    assert "schema_migrations" in inspect(engine).get_table_names()
+    engine.dispose()
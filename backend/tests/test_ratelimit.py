@@ -0,0 +1,51 @@
+from fastapi import HTTPException
+import pytest
+from sqlalchemy import create_engine
+
+from app.auth.ratelimit import DatabaseStore, MemoryStore, RateLimiter
+from app.db import RateLimitDB
+
+
+def _limiter(store, max_attempts=3):
+    return RateLimiter("test", max_attempts=max_attempts, window_seconds=60, store=store)
+
+
+def test_memory_store_limits_and_evicts():
+    store = MemoryStore(max_keys=2)
+    rl = _limiter(store)
+    for _ in range(3):
+        rl.check("a", "limite")
+        rl.hit("a")
+    with pytest.raises(HTTPException) as exc:
+        rl.check("a", "limite")
+    assert exc.value.status_code == 429
+
+    # Memoria acotada: las claves menos usadas se expulsan
+    rl.hit("b")
+    rl.hit("c")
+    assert len(store) == 2
+    assert rl.count("a") == 0
+
+
+def test_database_store_shared_between_limiters(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rl.db'}")
+    RateLimitDB.__table__.create(engine)
+    # Dos limitadores (como dos workers) sobre la misma tabla
+    worker_1 = _limiter(DatabaseStore(engine), max_attempts=2)
+    worker_2 = _limiter(DatabaseStore(engine), max_attempts=2)
+
+    worker_1.hit("ip")
+    worker_2.hit("ip")
+    assert worker_1.count("ip") == 2
+    with pytest.raises(HTTPException):
+        worker_2.check("ip", "limite")
+
+
+def test_sliding_window_weights_previous_window():
+    store = MemoryStore(max_keys=10)
+    store.hit("test:k", 9)
+    store.hit("test:k", 9)
+    # A mitad de la ventana 10, la ventana 9 pesa la mitad
+    index, elapsed = 10, 0.5
+    _, prev, curr = store.get("test:k", index)
+    assert prev * (1 - elapsed) + curr == 1
@@ -49,9 +49,12 @@ function App() {
   const fetchAllData = async () => {
     setLoading(true);
     try {
+      // Con token, el backend lee del primario justo despues de una edicion
+      const token = getToken();
+      const readOptions = token ? { headers: { Authorization: `Bearer ${token}` } } : {};
       const [categoriesRes, suppliersRes] = await Promise.all([
-        fetch(`${API_URL}/categories`),
-        fetch(`${API_URL}/suppliers`),
+        fetch(`${API_URL}/categories`, readOptions),
+        fetch(`${API_URL}/suppliers`, readOptions),
       ]);
       if (!categoriesRes.ok || !suppliersRes.ok)
         throw new Error("Error al obtener datos iniciales");
@@ -64,8 +67,10 @@ function App() {
       url.searchParams.append("limit", limit);
       url.searchParams.append("sort", sort);
       url.searchParams.append("order", order);
+      // Categoria y proveedor embebidos en la misma respuesta
+      url.searchParams.append("expand", "category,supplier");
 
-      const res = await fetch(url);
+      const res = await fetch(url, readOptions);
       if (!res.ok) throw new Error("Error al obtener productos");
 
       const data = await res.json();
@@ -736,15 +741,13 @@ function App() {
                     <div className="meta-item">
                       <span className="meta-label">Categoría:</span>
                       <span className="meta-badge">
-                        {categories.find((c) => c.id === p.categoria_id)
-                          ?.name ?? "N/A"}
+                        {p.category?.name ?? "N/A"}
                       </span>
                     </div>
                     <div className="meta-item">
                       <span className="meta-label">Proveedor:</span>
                       <span style={{ color: 'var(--text-secondary)' }}>
-                        {suppliers.find((s) => s.id === p.supplier_id)
-                          ?.name ?? "N/A"}
+                        {p.supplier?.name ?? "N/A"}
                       </span>
                     </div>
                   </div>
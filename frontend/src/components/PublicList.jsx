@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { Link } from "react-router-dom";
 import ThemeToggle from "./Themetoggle";
 import "../App.css";
@@ -51,6 +51,10 @@ function PublicList() {
             url.searchParams.append("limit", limit);
             url.searchParams.append("sort", sort);
             url.searchParams.append("order", order);
+            // Categoria y proveedor embebidos en la misma respuesta
+            url.searchParams.append("expand", "category,supplier");
+            // Filtro de categoria en el servidor: el total y la paginacion quedan correctos
+            if (selectedCategory) url.searchParams.append("categoria_id", selectedCategory);
 
             const res = await fetch(url);
             if (!res.ok) throw new Error("Error al obtener productos");
@@ -74,16 +78,30 @@ function PublicList() {
         fetchData();
     }, []);
 
+    // --- Cambios en vivo (server-sent events): recargar la página visible ---
+    const refreshRef = useRef(null);
+    refreshRef.current = () => fetchData(search, page * limit);
+    useEffect(() => {
+        const source = new EventSource(`${API_URL}/catalog/events`);
+        let timer;
+        source.onmessage = (event) => {
+            const { type } = JSON.parse(event.data);
+            if (type === "reset" || !type.startsWith("product.")) fetchCategoriesAndSuppliers();
+            // Varios cambios seguidos (importación) producen una sola recarga
+            clearTimeout(timer);
+            timer = setTimeout(() => refreshRef.current(), 300);
+        };
+        return () => {
+            clearTimeout(timer);
+            source.close();
+        };
+    }, []);
+
     // --- Buscar en tiempo real ---
     useEffect(() => {
         const delay = setTimeout(() => fetchData(search, page * limit), 400);
         return () => clearTimeout(delay);
-    }, [search, sort, order, page]);
-
-    // --- Filtrar por categoría ---
-    const filteredProducts = selectedCategory
-        ? products.filter((p) => p.categoria_id === parseInt(selectedCategory))
-        : products;
+    }, [search, sort, order, page, selectedCategory]);
 
     // --- UI Principal ---
     return (
@@ -203,7 +221,7 @@ function PublicList() {
                     </div>
                 )}
 
-                {!loading && filteredProducts.length === 0 && !error && (
+                {!loading && products.length === 0 && !error && (
                     <div className="loading-text">
                         <p>No se encontraron productos.</p>
                     </div>
@@ -211,7 +229,7 @@ function PublicList() {
 
                 <div className="products-grid">
                     {!loading &&
-                        filteredProducts.map((p) => (
+                        products.map((p) => (
                             <div key={p.id} className="product-card">
                                 <h3>{p.name}</h3>
                                 <p className="product-price">
@@ -224,15 +242,13 @@ function PublicList() {
                                     <div className="meta-item">
                                         <span className="meta-label">Categoría:</span>
                                         <span className="meta-badge">
-                                            {categories.find((c) => c.id === p.categoria_id)
-                                                ?.name ?? "N/A"}
+                                            {p.category?.name ?? "N/A"}
                                         </span>
                                     </div>
                                     <div className="meta-item">
                                         <span className="meta-label">Proveedor:</span>
                                         <span style={{ color: 'var(--text-secondary)' }}>
-                                            {suppliers.find((s) => s.id === p.supplier_id)
-                                                ?.name ?? "N/A"}
+                                            {p.supplier?.name ?? "N/A"}
                                         </span>
                                     </div>
                                 </div>